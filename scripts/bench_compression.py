@@ -0,0 +1,90 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+Response compression benchmark.
+Fetches the main list endpoints of a running service with identity, gzip and brotli
+Accept-Encoding and reports the bytes on the wire and the p50/p95 latency of each.
+With --seed it first creates students, classes and enrollments for the term so the lists
+have a realistic size.
+
+    uvicorn service.main:app --port 8080
+    python scripts/bench_compression.py --url http://localhost:8080 --seed 1000 [--repeat 50]
+'''
+import argparse
+import random
+import statistics
+import time
+
+import requests
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def seed(http: requests.Session, url: str, students: int, year: int, term: str):
+    class_ids = []
+    for index in range(20):
+        response = http.post(url + "/classes/", json={
+            "name": f"Class {index}", "description": "Benchmark class", "year": year, "term": term,
+            "min_grade": 1, "max_grade": 12, "max_students": students, "period": index % 4 + 1, "fee": 100,
+        })
+        class_ids.append(response.json()["id"])
+    for index in range(students):
+        response = http.post(url + "/students/", json={
+            "name": f"Student {index}", "birth_date": "2015-03-01T00:00:00", "email": f"student{index}@example.com",
+            "phone": "555-0100", "parent_name": f"Parent {index}", "address": f"{index} Main Street",
+            "gender": random.choice(["male", "female"]), "religion": "christian", "church": "Hill Church",
+            "korean_level": random.randint(1, 6), "grade": random.randint(1, 12),
+        })
+        student_id = response.json()["id"]
+        for class_id in random.sample(class_ids, 2):
+            http.post(url + "/enrollment/", json={
+                "student_id": student_id, "class_id": class_id, "status": "enrolled", "year": year, "term": term,
+            })
+
+
+def measure(http: requests.Session, url: str, encoding: str, repeat: int) -> dict:
+    sizes, latencies = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = http.get(url, headers={"Accept-Encoding": encoding}, stream=True)
+        body = response.raw.read(decode_content=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(body))
+    latencies.sort()
+    return {
+        "bytes": sizes[-1],
+        "encoding": response.headers.get("content-encoding", "identity"),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--seed", type=int, default=0, help="students to create first (2 enrollments each)")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--term", default="fall")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(7)
+    http = requests.Session()
+    if args.seed:
+        seed(http, args.url, args.seed, args.year, args.term)
+
+    endpoints = {
+        "students": "/students/",
+        "enrollment": f"/enrollment/?year={args.year}&term={args.term}",
+        "classes": f"/classes/?year={args.year}&term={args.term}",
+        "requests": "/requests/",
+    }
+    print(f"{'endpoint':<12} {'encoding':<9} {'bytes':>10} {'ratio':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, path in endpoints.items():
+        identity = None
+        for encoding in ENCODINGS:
+            r = measure(http, args.url + path, encoding, args.repeat)
+            identity = identity or r["bytes"]
+            print(f"{name:<12} {r['encoding']:<9} {r['bytes']:>10} {r['bytes'] / identity:>6.2f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+Benchmark for the in-process name index used by the student, teacher and user searches.
+Fills an index with generated Korean and English names and measures ranked search and
+candidates() latency for short and long queries, compared with a plain substring scan.
+
+    python scripts/bench_search_index.py [--sizes 1000 10000 100000] [--queries 2000]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from service.schemas import models  # noqa: E402
+from service.controls.search_index import SearchIndex, normalize  # noqa: E402
+
+FAMILY = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = "민수지우서연하준도윤예은시현주원재희성진영호"
+ENGLISH = ["min", "kim", "lee", "park", "grace", "daniel", "sarah", "joshua", "hannah", "david", "esther", "john"]
+
+
+def make_rows(size: int):
+    rows = []
+    for row_id in range(1, size + 1):
+        if row_id % 2:
+            name = random.choice(FAMILY) + "".join(random.choices(GIVEN, k=2))
+        else:
+            name = f"{random.choice(ENGLISH).title()} {random.choice(ENGLISH).title()}"
+        rows.append((row_id, name, f"{name.replace(' ', '').lower()}{row_id}@example.com"))
+    return rows
+
+
+def bench(size: int, queries: int) -> dict:
+    rows = make_rows(size)
+    index = SearchIndex(models.Student, [models.Student.name, models.Student.email])
+    start = time.perf_counter()
+    for row_id, name, email in rows:
+        index._put(index.state, row_id, (name, email))
+    index._finish(index.state)
+    index.version = 0
+    build_s = time.perf_counter() - start
+
+    terms = [row[1][:2] for row in random.sample(rows, min(queries, size))]
+    result = {"size": size, "build_s": build_s}
+    for label, run in (
+        ("search_us", lambda term: index.search(term, 20)),
+        ("prefix_us", lambda term: index.search(term, 20, prefix=True)),
+        ("candidates_us", index.candidates),
+    ):
+        start = time.perf_counter()
+        for term in terms:
+            run(term)
+        result[label] = (time.perf_counter() - start) / len(terms) * 1e6
+
+    docs = [normalize(name) + "\x00" + normalize(email) for _, name, email in rows]
+    sample = terms[:50]
+    start = time.perf_counter()
+    for term in sample:
+        [doc for doc in docs if normalize(term) in doc]
+    result["scan_us"] = (time.perf_counter() - start) / len(sample) * 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    random.seed(7)
+    print(f"{'rows':>8} {'build s':>8} {'search us':>10} {'prefix us':>10} {'cand. us':>10} {'scan us':>10}")
+    for size in args.sizes:
+        r = bench(size, args.queries)
+        print(f"{r['size']:>8} {r['build_s']:>8.2f} {r['search_us']:>10.1f} {r['prefix_us']:>10.1f} {r['candidates_us']:>10.1f} {r['scan_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+Benchmark for the waiting room queue used by SessionControl.
+Measures add / check (lookup + position) / remove latency at growing queue sizes, for each
+backend side by side; both should stay roughly flat as the queue grows.
+
+    python scripts/bench_session_queue.py [--sizes 100 1000 10000 100000] [--ops 5000] [--backends memory sqlite]
+'''
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from service.controls.session_queue import create_session_queue  # noqa: E402
+
+
+def bench(size: int, ops: int, backend: str) -> dict:
+    queue = create_session_queue(backend, os.path.join(tempfile.mkdtemp(), "session_queue.sqlite"))
+    keys = []
+    for i in range(size):
+        entry, _ = queue.add(f"parent{i}@example.com")
+        keys.append((entry.email, entry.session_key))
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        queue.touch(*random.choice(keys))
+    check_us = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    added = [queue.add(f"new{i}@example.com")[0] for i in range(ops)]
+    add_us = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    for entry in added:
+        queue.remove(entry.email, entry.session_key)
+    remove_us = (time.perf_counter() - start) / ops * 1e6
+
+    return {"size": size, "check_us": check_us, "add_us": add_us, "remove_us": remove_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--backends", choices=["memory", "sqlite"], nargs="+", default=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'queued':>10} {'check us':>10} {'add us':>10} {'remove us':>10}")
+    for backend in args.backends:
+        for size in args.sizes:
+            result = bench(size, args.ops, backend)
+            print(f"{backend:>8} {result['size']:>10} {result['check_us']:>10.2f} {result['add_us']:>10.2f} {result['remove_us']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
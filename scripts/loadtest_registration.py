@@ -0,0 +1,244 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+Registration-rush load test.
+Simulates N families hitting a running service the way the registration wizard does:
+
+    StartSession -> CheckSession polling until admitted -> GetCurrentTime polling
+    -> consents / classes fetch -> enrollment_condition for several classes -> EndSession
+
+and reports p50/p95/p99 latency, throughput and status codes per endpoint, plus
+overbooking (classes holding more enrollments than max_students) after the run.
+Results are written as JSON so runs can be compared across changes.
+
+Start the service locally first (SQLite fallback, or DATABASE_URL pointing at a MySQL container):
+
+    uvicorn service.main:app --port 8080
+    python scripts/loadtest_registration.py --url http://localhost:8080 --families 500 --seed \\
+        --output run.json [--baseline previous_run.json]
+'''
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and status collector."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def call(self, http: requests.Session, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = http.request(method, url, timeout=30, **kwargs)
+            status = str(response.status_code)
+        except requests.RequestException:
+            response = None
+            status = "error"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.latencies[name].append(elapsed_ms)
+            self.statuses[name][status] += 1
+        return response
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            statuses = dict(self.statuses[name])
+            errors = sum(count for status, count in statuses.items() if status == "error" or status.startswith("5"))
+            endpoints[name] = {
+                "requests": len(values),
+                "throughput_rps": len(values) / duration if duration else 0.0,
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "mean_ms": statistics.fmean(values),
+                "error_rate": errors / len(values),
+                "statuses": statuses,
+            }
+        return endpoints
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def seed(url: str, args) -> dict:
+    """Create the classes and one student per family for this run."""
+    http = requests.Session()
+    class_ids = []
+    for i in range(args.classes):
+        response = http.post(f"{url}/classes/", json={
+            "name": f"loadtest-{args.term}-{i}", "year": args.year, "term": args.term,
+            "max_students": args.capacity, "period": i % 3 + 1, "enrolled_number": 0,
+        })
+        response.raise_for_status()
+        class_ids.append(response.json()["id"])
+    student_ids = []
+    for i in range(args.families):
+        response = http.post(f"{url}/students/", json={"name": f"loadtest student {i}", "email": family_email(i)})
+        response.raise_for_status()
+        student_ids.append(response.json()["id"])
+    return {"class_ids": class_ids, "student_ids": student_ids}
+
+
+def family_email(i: int) -> str:
+    return f"loadtest-family-{i}@example.com"
+
+
+def run_family(url: str, recorder: Recorder, args, family: int, student_id: int, class_ids):
+    http = requests.Session()
+    email = family_email(family)
+    response = recorder.call(http, "StartSession", "POST", f"{url}/StartSession", params={"email": email})
+    if response is None or response.status_code != 200:
+        return
+    session = response.json()
+    session_key = session["session_key"]
+    admitted = session.get("admitted", True)
+
+    # Wait in the queue the way the webapp polls
+    deadline = time.monotonic() + args.max_wait
+    while not admitted and time.monotonic() < deadline:
+        time.sleep(args.poll_interval)
+        response = recorder.call(http, "CheckSession", "POST", f"{url}/CheckSession",
+                                 params={"email": email, "session_key": session_key})
+        if response is None or response.status_code != 200:
+            continue
+        state = response.json()
+        if state.get("position") == -1:
+            return
+        admitted = state.get("admitted", state.get("position", 0) <= args.admit_limit)
+    if not admitted:
+        return
+
+    for _ in range(args.clock_polls):
+        recorder.call(http, "GetCurrentTime", "GET", f"{url}/schedules/GetCurrentTime")
+    recorder.call(http, "consents", "GET", f"{url}/consents/")
+    recorder.call(http, "classes", "GET", f"{url}/classes/", params={"year": args.year, "term": args.term})
+
+    for class_id in random.sample(class_ids, min(args.classes_per_family, len(class_ids))):
+        recorder.call(http, "enrollment_condition", "POST", f"{url}/enrollment_condition/",
+                      params={"email": email, "session_key": session_key},
+                      json={"student_id": student_id, "class_id": class_id, "year": args.year,
+                            "term": args.term, "status": "draft", "comment": "loadtest"})
+
+    recorder.call(http, "EndSession", "POST", f"{url}/EndSession", params={"email": email, "session_key": session_key})
+
+
+def overbooking(url: str, args, class_ids) -> dict:
+    """Compare enrollments per class against max_students after the run."""
+    http = requests.Session()
+    classes = {c["id"]: c for c in http.get(f"{url}/classes/", params={"year": args.year, "term": args.term}).json()}
+    response = http.get(f"{url}/enrollment/", params={"year": args.year, "term": args.term})
+    enrollments = response.json() if response.status_code == 200 else []
+    counts = defaultdict(int)
+    for enrollment in enrollments:
+        counts[enrollment["class_id"]] += 1
+    overbooked = {}
+    drift = {}
+    for class_id in class_ids:
+        record = classes.get(class_id)
+        if record is None:
+            continue
+        over = counts[class_id] - (record["max_students"] or 0)
+        if over > 0:
+            overbooked[class_id] = over
+        if record["enrolled_number"] != counts[class_id]:
+            drift[class_id] = {"enrolled_number": record["enrolled_number"], "actual": counts[class_id]}
+    return {
+        "enrollments": sum(counts[class_id] for class_id in class_ids),
+        "overbooked_classes": len(overbooked),
+        "overbooked_seats": sum(overbooked.values()),
+        "enrolled_number_drift": drift,
+    }
+
+
+def compare(result: dict, baseline: dict):
+    print(f"\n{'endpoint':<22} {'p95 ms':>10} {'baseline':>10} {'delta':>8}")
+    for name, stats in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        delta = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        print(f"{name:<22} {stats['p95_ms']:>10.1f} {before['p95_ms']:>10.1f} {delta:>7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--families", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100, help="families in flight at once")
+    parser.add_argument("--year", type=int, default=2099)
+    parser.add_argument("--term", default="loadtest")
+    parser.add_argument("--seed", action="store_true", help="create classes and students before the run")
+    parser.add_argument("--class-ids", type=int, nargs="*", default=[], help="existing classes to enroll into")
+    parser.add_argument("--student-id", type=int, default=1, help="student used when not seeding")
+    parser.add_argument("--classes", type=int, default=6, help="classes to create with --seed")
+    parser.add_argument("--capacity", type=int, default=20, help="max_students of seeded classes")
+    parser.add_argument("--classes-per-family", type=int, default=3)
+    parser.add_argument("--clock-polls", type=int, default=5)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--max-wait", type=float, default=300.0, help="seconds a family waits to be admitted")
+    parser.add_argument("--admit-limit", type=int, default=25, help="used only if the server does not report admission")
+    parser.add_argument("--output", help="write the JSON result here")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare p95 against")
+    args = parser.parse_args()
+    url = args.url.rstrip("/")
+
+    if args.seed:
+        seeded = seed(url, args)
+        class_ids, student_ids = seeded["class_ids"], seeded["student_ids"]
+    else:
+        class_ids, student_ids = args.class_ids, [args.student_id] * args.families
+    if not class_ids:
+        parser.error("pass --seed or --class-ids")
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for family in range(args.families):
+            pool.submit(run_family, url, recorder, args, family, student_ids[family], class_ids)
+    duration = time.perf_counter() - start
+
+    endpoints = recorder.report(duration)
+    result = {
+        "url": url,
+        "families": args.families,
+        "concurrency": args.concurrency,
+        "duration_s": duration,
+        "total_requests": sum(stats["requests"] for stats in endpoints.values()),
+        "throughput_rps": sum(stats["requests"] for stats in endpoints.values()) / duration,
+        "endpoints": endpoints,
+        "overbooking": overbooking(url, args, class_ids),
+    }
+
+    print(f"{'endpoint':<22} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in endpoints.items():
+        print(f"{name:<22} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['error_rate']:>7.1%}")
+    print(f"total {result['total_requests']} requests in {duration:.1f}s ({result['throughput_rps']:.1f} rps)")
+    print(f"overbooking: {json.dumps(result['overbooking'])}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(result, output_file, indent=4)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            compare(result, json.load(baseline_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+Soak test for waiting room session expiry.
+Runs SessionControl.run_expiry, the same coroutine the app lifespan starts, against a
+queue of N sessions in real time. Every tick each live client polls check(), a share of
+them walk away for good (--churn) and new families join to keep the queue full, so a large
+share of all sessions (about 40% with the defaults) expires during the soak.
+
+Per round it reports the queue size, sessions expired, the longest sweep, the slowest
+check() (which waits on the lock a sweep holds) and the thread count. The soak fails if
+threads grow after the first sweep or abandoned sessions outlive timeout + 2 intervals.
+
+    python scripts/soak_session_expiry.py [--sessions 20000] [--rounds 30] [--churn 0.1] [--backend memory]
+'''
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+async def soak(args, control) -> bool:
+    sweeps = []
+    sweep = control.remove_disconnected
+
+    def timed_sweep():
+        start = time.perf_counter()
+        sweep()
+        sweeps.append((time.perf_counter() - start) * 1000)
+
+    control.remove_disconnected = timed_sweep
+    expiry = asyncio.create_task(control.run_expiry(interval=args.interval))
+
+    live = [(entry["email"], entry["session_key"]) for entry in (control.add(f"parent{i}@example.com") for i in range(args.sessions))]
+    abandoned = []  # (time the client left, key)
+    added = args.sessions
+    threads_after_first = None
+    ok = True
+    print(f"{'round':>5} {'queued':>8} {'expired':>8} {'sweep ms':>9} {'check ms':>9} {'threads':>8}")
+    for round_no in range(1, args.rounds + 1):
+        await asyncio.sleep(args.tick)
+        worst_check = 0.0
+        still_live = []
+        for key in live:
+            if random.random() < args.churn:
+                abandoned.append((datetime.now(), key))
+                continue
+            start = time.perf_counter()
+            control.check(*key)
+            worst_check = max(worst_check, (time.perf_counter() - start) * 1000)
+            still_live.append(key)
+            if len(still_live) % 1000 == 0:
+                await asyncio.sleep(0)  # let the sweep thread's result be picked up
+        for i in range(len(live) - len(still_live)):
+            session = control.add(f"late{round_no}-{i}@example.com")
+            still_live.append((session["email"], session["session_key"]))
+            added += 1
+        live = still_live
+
+        queued = len(control.session_queue)
+        round_sweeps, sweeps[:] = list(sweeps), []
+        if round_sweeps and threads_after_first is None:
+            threads_after_first = threading.active_count()
+        print(f"{round_no:>5} {queued:>8} {added - queued:>8} {max(round_sweeps, default=0.0):>9.2f} "
+              f"{worst_check:>9.2f} {threading.active_count():>8}")
+
+    # Abandoned sessions older than the timeout plus two sweeps must be gone by now
+    overdue = datetime.now() - timedelta(seconds=args.timeout + 2 * args.interval)
+    survivors = sum(1 for left, key in abandoned if left < overdue and control.check(*key)["position"] != -1)
+    expiry.cancel()
+    await asyncio.gather(expiry, return_exceptions=True)
+
+    expired = added - len(control.session_queue)
+    print(f"sessions added={added} expired={expired} ({expired / added:.0%}), overdue survivors={survivors}")
+    print(f"threads after first sweep={threads_after_first} at end={threading.active_count()}")
+    if survivors:
+        print("abandoned sessions outlived the timeout")
+        ok = False
+    if threads_after_first is not None and threading.active_count() > threads_after_first:
+        print("thread count grew during the soak")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=3, help="session timeout in seconds")
+    parser.add_argument("--interval", type=float, default=1, help="seconds between expiry sweeps")
+    parser.add_argument("--tick", type=float, default=0.5, help="seconds between client polls")
+    parser.add_argument("--churn", type=float, default=0.1, help="share of live clients leaving each tick")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    # SessionControl reads its backend from the environment at import
+    os.environ["SESSION_QUEUE_BACKEND"] = args.backend
+    os.environ["SESSION_QUEUE_PATH"] = os.path.join(tempfile.mkdtemp(), "session_queue.sqlite")
+    from service.controls.session_control import SessionControl
+
+    logging.disable(logging.WARNING)  # check() logs every call, and every expired key it is given
+    control = SessionControl.get_instance()
+    control.session_timeout = args.timeout
+    random.seed(7)
+    if not asyncio.run(soak(args, control)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
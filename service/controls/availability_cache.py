@@ -0,0 +1,129 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file defines the in-process class availability snapshot behind /classes/availability.
+Each (year, term) snapshot holds only (class_id, enrolled_number, max_students), already
+serialized, so the endpoint answers without touching the database.
+
+Controls that change a class count call mark_availability_dirty() on their session; the
+affected snapshots are dropped when that session commits. Other uvicorn workers do not see
+the commit, so every snapshot is also rebuilt after AVAILABILITY_TTL_SECONDS.
+'''
+import os
+import json
+import time
+import zlib
+import logging
+from threading import Lock
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..db_config import SessionLocal
+from ..schemas import models
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Upper bound on how stale a snapshot can be for changes made by another worker
+AVAILABILITY_TTL_SECONDS = float(os.getenv("AVAILABILITY_TTL_SECONDS", "2"))
+
+# Session.info key holding the (year, term) pairs to invalidate on commit; None means all
+DIRTY_KEY = "availability_dirty"
+
+
+class AvailabilitySnapshot:
+    __slots__ = ("version", "payload", "built_at")
+
+    def __init__(self, version: int, payload: bytes, built_at: float):
+        self.version = version  # crc32 of the payload, the same in every worker for the same data
+        self.payload = payload  # JSON body ready to send
+        self.built_at = built_at
+
+
+class AvailabilityCache:
+    _instance = None
+
+    def __init__(self, ttl: float = AVAILABILITY_TTL_SECONDS):
+        self.ttl = ttl
+        self.snapshots = {}
+        self.latest = {}  # last snapshot built per term, valid or not
+        self.lock = Lock()  # guards snapshots and generation
+        self.generation = 0  # bumped by every invalidation
+        self.build_lock = Lock()  # one rebuild at a time, so a burst of readers costs one query
+        self.hits = 0
+        self.builds = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, year: int, term: str) -> AvailabilitySnapshot:
+        """Return the term's snapshot, rebuilding it if it was invalidated or is older than the TTL."""
+        key = (year, term)
+        arrived = time.monotonic()
+        snapshot = self.snapshots.get(key)
+        if snapshot is not None and arrived - snapshot.built_at < self.ttl:
+            self.hits += 1
+            return snapshot
+        with self.build_lock:
+            # A snapshot read after this request arrived is fresh enough for it, even if a
+            # commit has invalidated it since; this keeps a write burst to one query at a time
+            snapshot = self.latest.get(key)
+            if snapshot is not None and snapshot.built_at >= arrived:
+                self.hits += 1
+                return snapshot
+            generation = self.generation
+            snapshot = self._build(year, term)
+            with self.lock:
+                self.latest[key] = snapshot
+                # Not cached if a commit invalidated while we were reading; it may predate that commit
+                if self.generation == generation:
+                    self.snapshots[key] = snapshot
+            return snapshot
+
+    def _build(self, year: int, term: str) -> AvailabilitySnapshot:
+        built_at = time.monotonic()
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(models.Class.id, models.Class.enrolled_number, models.Class.max_students)
+                .filter(models.Class.year == year, models.Class.term == term)
+                .order_by(models.Class.id)
+                .all()
+            )
+        finally:
+            db.close()
+        classes = [[class_id, enrolled_number or 0, max_students] for class_id, enrolled_number, max_students in rows]
+        version = zlib.crc32(json.dumps(classes).encode())
+        payload = json.dumps({"year": year, "term": term, "version": version, "classes": classes}, separators=(",", ":")).encode()
+        self.builds += 1
+        return AvailabilitySnapshot(version, payload, built_at)
+
+    def invalidate(self, keys=None):
+        """Drop the snapshots of the given (year, term) pairs, or all of them."""
+        with self.lock:
+            self.generation += 1
+            if keys is None:
+                self.snapshots.clear()
+            else:
+                for key in keys:
+                    self.snapshots.pop(key, None)
+
+
+def mark_availability_dirty(db: Session, year: int = None, term: str = None):
+    """Invalidate a term's snapshot (or every snapshot when year/term are unknown) once db commits."""
+    if year is None or term is None:
+        db.info[DIRTY_KEY] = None
+    elif db.info.get(DIRTY_KEY, set()) is not None:
+        db.info.setdefault(DIRTY_KEY, set()).add((year, term))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session: Session):
+    if DIRTY_KEY in session.info:
+        AvailabilityCache.get_instance().invalidate(session.info.pop(DIRTY_KEY))
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction):
+    session.info.pop(DIRTY_KEY, None)
@@ -1,9 +1,21 @@
 import logging
+from collections import defaultdict
 from sqlalchemy.orm import Session
 from ..schemas import models, schemas_entity
+from .enrollment_control import EnrollmentControl
+from .availability_cache import mark_availability_dirty
+from .response_cache import ResponseCache, serialize, serialize_one, table_version
+from .pagination import DEFAULT_PAGE_SIZE, paginate
+from .sparse_fields import select_fields, project, project_one
+from .student_control import StudentControl
 
 logger = logging.getLogger(__name__)
 
+# Keyed by the Class table version too, so enrollment count changes also turn entries stale
+class_cache = ResponseCache.named("classes")
+# Keyed by the Class, Enrollment and Student versions
+classroom_cache = ResponseCache.named("classroom")
+
 class ClassControl:
     def __init__(self, db: Session):
         self.db = db
@@ -12,7 +24,9 @@ class ClassControl:
         """Add a new class to the database."""
         new_class = models.Class(**class_data.dict())
         self.db.add(new_class)
+        mark_availability_dirty(self.db, new_class.year, new_class.term)
         self.db.commit()
+        class_cache.invalidate()
         self.db.refresh(new_class)
         return new_class
 
@@ -21,9 +35,15 @@ class ClassControl:
         class_instance = self.db.query(models.Class).filter(models.Class.id == class_id).first()
         if not class_instance:
             return None
+        mark_availability_dirty(self.db, class_instance.year, class_instance.term)
         for key, value in class_data.dict().items():
             setattr(class_instance, key, value)
+        mark_availability_dirty(self.db, class_instance.year, class_instance.term)
+        # Seats added by raising max_students go to the waitlist first
+        self.db.flush()
+        EnrollmentControl(self.db).promote_waitlist(class_instance.id, class_instance.year, class_instance.term)
         self.db.commit()
+        class_cache.invalidate()
         self.db.refresh(class_instance)
         return class_instance
 
@@ -33,7 +53,9 @@ class ClassControl:
         if not class_instance:
             return None
         self.db.delete(class_instance)
+        mark_availability_dirty(self.db, class_instance.year, class_instance.term)
         self.db.commit()
+        class_cache.invalidate()
         return class_instance
 
     def get(self, class_id: int):
@@ -41,8 +63,8 @@ class ClassControl:
         class_instance = self.db.query(models.Class).filter(models.Class.id == class_id).first()
         return class_instance
 
-    def search(self, name: str = None, year: int = None, term: str = None):
-        """Search for classes by name, year, or term."""
+    def _search_query(self, name: str = None, year: int = None, term: str = None, teacher_id: int = None,
+                      grade: int = None, korean_level: int = None):
         query = self.db.query(models.Class)
         if name:
             query = query.filter(models.Class.name.ilike(f"%{name}%"))
@@ -50,4 +72,75 @@ class ClassControl:
             query = query.filter(models.Class.year == year)
         if term:
             query = query.filter(models.Class.term.ilike(f"%{term}%"))
-        return query.all()
+        if teacher_id is not None:
+            query = query.filter(models.Class.teacher_id == teacher_id)
+        if grade is not None:
+            # Classes open to this grade; a missing bound does not restrict
+            query = query.filter(
+                (models.Class.min_grade.is_(None) | (models.Class.min_grade <= grade)) &
+                (models.Class.max_grade.is_(None) | (models.Class.max_grade >= grade))
+            )
+        if korean_level is not None:
+            query = query.filter(
+                (models.Class.min_korean_level.is_(None) | (models.Class.min_korean_level <= korean_level)) &
+                (models.Class.max_korean_level.is_(None) | (models.Class.max_korean_level >= korean_level))
+            )
+        return query
+
+    def search(self, name: str = None, year: int = None, term: str = None):
+        """Search for classes by name, year, or term."""
+        return self._search_query(name, year, term).all()
+
+    def page(self, name: str = None, year: int = None, term: str = None, teacher_id: int = None,
+             grade: int = None, korean_level: int = None,
+             limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, with_total: bool = False) -> dict:
+        """One page of classes matching the filters, ordered by id."""
+        query = self._search_query(name, year, term, teacher_id, grade, korean_level)
+        return paginate(query, models.Class.id, limit, cursor, with_total=with_total)
+
+    def search_json(self, name: str = None, year: int = None, term: str = None, fields: str = None) -> bytes:
+        """search() serialized as JSON, served from the class catalog cache; fields limits the columns."""
+        if fields:
+            columns = select_fields(models.Class, schemas_entity.Class, fields)
+            build = lambda: project(self._search_query(name, year, term), columns)
+            fields = tuple(column.key for column in columns)
+        else:
+            build = lambda: serialize(schemas_entity.Class, self.search(name=name, year=year, term=term))
+        return class_cache.get_or_build((table_version(models.Class.__tablename__), name, year, term, fields), build)
+
+    def get_fields(self, class_id: int, fields: str):
+        """get() as JSON with only the requested fields, or None if there is no such class."""
+        query = self.db.query(models.Class).filter(models.Class.id == class_id)
+        return project_one(query, select_fields(models.Class, schemas_entity.Class, fields))
+
+    def snapshot_json(self, year: int, term: str, name: str = None) -> bytes:
+        """Classes of a term with their enrollments, and the students to place in them, as one JSON document.
+        Three queries whatever the size of the term; name narrows the students like the student search,
+        and they include students not enrolled yet, whom the classroom manager adds to classes."""
+        def build():
+            enrollments = defaultdict(list)
+            for enrollment_id, class_id, student_id, status in (
+                self.db.query(models.Enrollment.id, models.Enrollment.class_id, models.Enrollment.student_id,
+                              models.Enrollment.status)
+                .filter(models.Enrollment.year == year, models.Enrollment.term == term)
+                .order_by(models.Enrollment.id)
+            ):
+                enrollments[class_id].append((enrollment_id, student_id, status))
+            classes = [
+                dict(row._asdict(), enrollments=enrollments.get(row.id, []))
+                for row in self._search_query(year=year, term=term).with_entities(*models.Class.__table__.columns)
+            ]
+            students = (
+                StudentControl(self.db)._search_query(name)
+                .with_entities(models.Student.id, models.Student.name, models.Student.grade,
+                               models.Student.korean_level, models.Student.parent_name)
+                .order_by(models.Student.id)
+            )
+            return serialize_one(schemas_entity.ClassroomSnapshot,
+                                 {"year": year, "term": term, "classes": classes, "students": students.all()})
+
+        if name:  # one per keystroke of the search box; not worth keeping
+            return build()
+        key = tuple(table_version(table) for table in (models.Class.__tablename__, models.Enrollment.__tablename__,
+                                                       models.Student.__tablename__))
+        return classroom_cache.get_or_build(key + (year, term), build)
@@ -0,0 +1,136 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file implements negotiated response compression (brotli when the client accepts it and
+the brotli package is installed, otherwise gzip). Bodies below COMPRESSION_MIN_BYTES, bodies
+that are not text/JSON, streamed bodies and already encoded bodies are sent unchanged.
+
+Bodies served from a ResponseCache are CachedBody instances that keep their compressed forms,
+so a cached list is compressed once per encoding instead of once per request.
+'''
+import os
+import gzip
+import logging
+from threading import Lock
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed; the headers would eat most of the saving
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# gzip level 1-9 and brotli quality 0-11; higher is smaller but slower
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def supported_encodings() -> tuple:
+    """Encodings this process can produce, preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str):
+    """Best supported encoding allowed by an Accept-Encoding header, or None for identity."""
+    allowed = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        allowed[coding.strip()] = quality
+    for encoding in supported_encodings():
+        if allowed.get(encoding, allowed.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CachedBody(bytes):
+    """A cached response body that remembers its compressed forms."""
+
+    def __new__(cls, payload: bytes):
+        body = super().__new__(cls, payload)
+        body.variants = {}
+        body.lock = Lock()
+        return body
+
+    def compressed(self, encoding: str) -> bytes:
+        with self.lock:
+            if encoding not in self.variants:
+                self.variants[encoding] = compress(self, encoding)
+            return self.variants[encoding]
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete response bodies the client can decode."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # held until the body shows whether to compress
+                return
+            if start is None or passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            response_headers = start["headers"]
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(response_headers, body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            body = body.compressed(encoding) if isinstance(body, CachedBody) else compress(body, encoding)
+            response_headers = [(name, value) for name, value in response_headers
+                                if name.lower() not in (b"content-length", b"vary")]
+            vary = [value for name, value in start["headers"] if name.lower() == b"vary"]
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": response_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, response_headers, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in response_headers:
+            name = name.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
@@ -1,9 +1,12 @@
 import logging
 from sqlalchemy.orm import Session
 from ..schemas import models, schemas_entity
+from .response_cache import ResponseCache, serialize, table_version
 
 logger = logging.getLogger(__name__)
 
+consent_cache = ResponseCache.named("consents")
+
 class ConsentControl:
     def __init__(self, db: Session):
         self.db = db
@@ -13,6 +16,7 @@ class ConsentControl:
         new_consent = models.Consent(**consent_data.dict())
         self.db.add(new_consent)
         self.db.commit()
+        consent_cache.invalidate()
         self.db.refresh(new_consent)
         return new_consent
 
@@ -24,6 +28,7 @@ class ConsentControl:
         for key, value in consent_data.dict().items():
             setattr(consent_instance, key, value)
         self.db.commit()
+        consent_cache.invalidate()
         self.db.refresh(consent_instance)
         return consent_instance
 
@@ -34,6 +39,7 @@ class ConsentControl:
             return None
         self.db.delete(consent_instance)
         self.db.commit()
+        consent_cache.invalidate()
         return consent_instance
 
     def get(self, consent_id: int):
@@ -45,3 +51,10 @@ class ConsentControl:
         """Search for consentes by name, year, or term."""
         query = self.db.query(models.Consent)
         return query.all()
+
+    def search_json(self) -> bytes:
+        """search() serialized as JSON, served from the consent cache."""
+        return consent_cache.get_or_build(
+            (table_version(models.Consent.__tablename__),),
+            lambda: serialize(schemas_entity.Consent, self.search()),
+        )
@@ -1,56 +1,292 @@
+import os
+import base64
+import asyncio
+import logging
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
+from sqlalchemy import update, delete, insert, select, literal, and_, or_, text
+from sqlalchemy.exc import IntegrityError
+from ..db_config import SessionLocal
+from .availability_cache import mark_availability_dirty
 from ..schemas import models, schemas_entity
 from fastapi import HTTPException
-from datetime import datetime 
-import threading
+from datetime import datetime, timedelta
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Enrollment statuses that do not hold a seat in the class
+NON_SEAT_STATUSES = ("dropped", "waitlisted")
+# Enrollments that count towards a class's enrolled_number (a NULL status holds a seat)
+SEAT_TAKEN = or_(models.Enrollment.status.is_(None), models.Enrollment.status.notin_(NON_SEAT_STATUSES))
+# Status a waitlisted enrollment gets when a seat opens; the same one the registration wizard uses
+WAITLIST_PROMOTED_STATUS = "draft"
+# How often enrolled_number is recounted to catch drift
+ENROLLMENT_RECONCILE_INTERVAL_SECONDS = float(os.getenv("ENROLLMENT_RECONCILE_INTERVAL_SECONDS", "600"))
+# updated_at and deleted_at are stamped when a row is written, not when it commits. The changes
+# cursor stays the database's lock-wait timeout plus this margin behind the clock: a writer
+# stamped before waiting on a Class row lock commits at most that late, and the margin covers
+# the commit itself and MySQL truncating timestamps to the second
+ENROLLMENT_CHANGES_SETTLE_SECONDS = float(os.getenv("ENROLLMENT_CHANGES_SETTLE_SECONDS", "2"))
+# pysqlite waits this long for a locked database before failing
+SQLITE_BUSY_TIMEOUT_SECONDS = 5.0
+# Tombstones older than this are pruned; older cursors get a full reset
+ENROLLMENT_TOMBSTONE_RETENTION_DAYS = float(os.getenv("ENROLLMENT_TOMBSTONE_RETENTION_DAYS", "7"))
+
+_lock_wait_seconds = {}  # dialect name -> lock-wait timeout, read once
+
+
+def lock_wait_seconds(db: Session) -> float:
+    """Longest a statement waits for a row lock before the database gives up."""
+    dialect = db.get_bind().dialect.name
+    if dialect not in _lock_wait_seconds:
+        if dialect == "mysql":
+            _lock_wait_seconds[dialect] = float(db.execute(text("SELECT @@innodb_lock_wait_timeout")).scalar())
+        else:
+            _lock_wait_seconds[dialect] = SQLITE_BUSY_TIMEOUT_SECONDS
+    return _lock_wait_seconds[dialect]
+
+
 class EnrollmentControl:
     def __init__(self, db: Session):
         self.db = db
 
-    def _update_enrolled_number(self, class_id: int, year: int, term: str):
-        """Update the enrolled_number for a specific class, filtered by year and term."""
-        lock = threading.Lock()
-        with lock:
-            enrolled_count = (
-                self.db.query(func.count(models.Enrollment.id))
-                .filter(
-                    models.Enrollment.class_id == class_id,
-                models.Enrollment.year == year,
-                models.Enrollment.term == term
-                )
-                .scalar()
+    @staticmethod
+    def _takes_seat(status: str) -> bool:
+        """Dropped and waitlisted enrollments do not count towards enrolled_number."""
+        return status not in NON_SEAT_STATUSES
+
+    def _adjust_enrolled_number(self, class_id: int, year: int, term: str, delta: int):
+        """Apply a +1/-1 change to the class's enrolled_number in the caller's transaction.
+        Only enrollments of the class's own year and term count, as in reconcile(). Does not commit."""
+        if not delta:
+            return
+        mark_availability_dirty(self.db, year, term)
+        self.db.execute(
+            update(models.Class)
+            .where(models.Class.id == class_id, models.Class.year == year, models.Class.term == term)
+            .values(enrolled_number=func.coalesce(models.Class.enrolled_number, 0) + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _reserve_seat(self, class_id: int, year: int, term: str, seats: int = 1) -> bool:
+        """Take seats with a single conditional UPDATE; the row lock makes the check and
+        the increment atomic, so concurrent callers can never overbook. Like
+        _adjust_enrolled_number(), only a class of the enrollment's year and term matches. Does not commit."""
+        result = self.db.execute(
+            update(models.Class)
+            .where(
+                models.Class.id == class_id,
+                models.Class.year == year,
+                models.Class.term == term,
+                func.coalesce(models.Class.enrolled_number, 0) + seats <= models.Class.max_students
             )
-            class_record = self.db.query(models.Class).filter(models.Class.id == class_id).first()
-            if class_record:
-                class_record.enrolled_number = enrolled_count
+            .values(enrolled_number=func.coalesce(models.Class.enrolled_number, 0) + seats)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            mark_availability_dirty(self.db, year, term)
+        return result.rowcount == 1
+
+    def _commit(self, flush_only: bool = False):
+        """Commit (or flush), reporting a second enrollment of a student in the same class and term as 409."""
+        try:
+            if flush_only:
+                self.db.flush()
+            else:
                 self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise HTTPException(status_code=409, detail="Student is already enrolled in this class")
+
+    def _add_tombstone(self, enrollment_id: int, year: int, term: str):
+        """Record that an enrollment left (year, term) for the changes feed. Does not commit."""
+        self.db.add(models.EnrollmentTombstone(enrollment_id=enrollment_id, year=year, term=term, deleted_at=datetime.utcnow()))
+
+    def _waitlist_query(self, class_id: int, year: int, term: str):
+        """Waitlisted enrollments of one class in arrival (id) order."""
+        return (
+            self.db.query(models.Enrollment)
+            .filter(
+                models.Enrollment.class_id == class_id,
+                models.Enrollment.year == year,
+                models.Enrollment.term == term,
+                models.Enrollment.status == "waitlisted"
+            )
+            .order_by(models.Enrollment.id)
+        )
+
+    def waitlist_position(self, enrollment: models.Enrollment):
+        """1-based place of a waitlisted enrollment in its class's waitlist, or None if it is not waitlisted."""
+        if enrollment is None or enrollment.status != "waitlisted":
+            return None
+        return (
+            self._waitlist_query(enrollment.class_id, enrollment.year, enrollment.term)
+            .filter(models.Enrollment.id <= enrollment.id)
+            .count()
+        )
+
+    def _waitlist(self, enrollment_data: schemas_entity.EnrollmentCreate):
+        """Insert the enrollment at the tail of its class's waitlist. Does not commit."""
+        new_enrollment = models.Enrollment(**enrollment_data.dict())
+        new_enrollment.status = "waitlisted"
+        self.db.add(new_enrollment)
+        self._commit(flush_only=True)
+        return new_enrollment
+
+    def promote_waitlist(self, class_id: int, year: int, term: str):
+        """Move waitlisted enrollments into the class while it has free seats, oldest first.
+        Runs in the caller's transaction so a freed seat is handed over atomically. Does not commit."""
+        promoted = []
+        lost = []  # heads another transaction promoted first; never retried, so the loop ends
+        while True:
+            query = self._waitlist_query(class_id, year, term)
+            if lost:
+                query = query.filter(models.Enrollment.id.notin_(lost))
+            # A locking read sees the latest commit rather than this transaction's snapshot, and
+            # skipping locked rows lets concurrent promoters take different heads
+            head = query.with_for_update(skip_locked=True).first()
+            if head is None or not self._reserve_seat(class_id, year, term):
+                break
+            head_id = head.id
+            # Another transaction may have promoted the same head; only one UPDATE wins
+            result = self.db.execute(
+                update(models.Enrollment)
+                .where(models.Enrollment.id == head_id, models.Enrollment.status == "waitlisted")
+                .values(status=WAITLIST_PROMOTED_STATUS, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            self.db.expire(head)
+            if result.rowcount != 1:
+                lost.append(head_id)
+                self._adjust_enrolled_number(class_id, year, term, -1)
+                continue
+            promoted.append(head_id)
+            logger.info(f"Promoted enrollment {head_id} from the waitlist of class {class_id}")
+        return promoted
 
     def add(self, enrollment_data: schemas_entity.EnrollmentCreate):
         """Add a new enrollment to the database."""
         new_enrollment = models.Enrollment(**enrollment_data.dict())
         self.db.add(new_enrollment)
-        self.db.commit()
+        if self._takes_seat(new_enrollment.status):
+            self._adjust_enrolled_number(new_enrollment.class_id, new_enrollment.year, new_enrollment.term, 1)
+        self._commit()
         self.db.refresh(new_enrollment)
-        self._update_enrolled_number(new_enrollment.class_id, new_enrollment.year, new_enrollment.term)  # Update enrolled_number
         return new_enrollment
 
-    def condition_add(self, enrollment_data: schemas_entity.EnrollmentCreate):
-        """Add a new enrollment to the database with a condition."""
-        class_record = self.db.query(models.Class).filter(models.Class.id == enrollment_data.class_id).first()
-        if not class_record:
-            raise HTTPException(status_code=404, detail="Class not found")
-
-        if class_record.enrolled_number >= class_record.max_students:
-            raise HTTPException(status_code=400, detail="Class is full")
+    def condition_add(self, enrollment_data: schemas_entity.EnrollmentCreate, waitlist: bool = False):
+        """Add a new enrollment only if a seat could be reserved in the class.
+        The seat reservation and the insert are committed in one transaction.
+        With waitlist, a full class puts the enrollment on its waitlist instead of failing."""
+        if not self._reserve_seat(enrollment_data.class_id, enrollment_data.year, enrollment_data.term):
+            self.db.rollback()
+            class_exists = self.db.query(models.Class.id).filter(
+                models.Class.id == enrollment_data.class_id,
+                models.Class.year == enrollment_data.year,
+                models.Class.term == enrollment_data.term
+            ).first()
+            if not class_exists:
+                raise HTTPException(status_code=404, detail="Class not found")
+            if not waitlist:
+                raise HTTPException(status_code=400, detail="Class is full")
+            new_enrollment = self._waitlist(enrollment_data)
+            self._commit()
+            self.db.refresh(new_enrollment)
+            new_enrollment.waitlist_position = self.waitlist_position(new_enrollment)
+            return new_enrollment
 
         new_enrollment = models.Enrollment(**enrollment_data.dict())
         self.db.add(new_enrollment)
-        self.db.commit()
+        self._commit()
         self.db.refresh(new_enrollment)
-        self._update_enrolled_number(new_enrollment.class_id, new_enrollment.year, new_enrollment.term)  # Update enrolled_number
+        new_enrollment.reserved = True
         return new_enrollment
 
+    def condition_add_batch(self, enrollments: list, all_or_nothing: bool = True, waitlist: bool = False):
+        """Enroll a family's selections (any number of students and classes) in one transaction.
+
+        Class existence and existing enrollments are checked with one query each, and an item
+        repeating an existing enrollment or an earlier item is "Already enrolled". With all_or_nothing, each class is reserved
+        once for all of its requested seats, and nothing is written unless every class has room.
+        Otherwise seats are reserved item by item and the items that fit are kept.
+        With waitlist, items of full classes are waitlisted instead of failing.
+        Returns (success, per-item results in request order)."""
+        class_ids = {item.class_id for item in enrollments}
+        existing = {tuple(row) for row in self.db.query(models.Class.id, models.Class.year, models.Class.term).filter(models.Class.id.in_(class_ids))}
+        # Seats are reserved per (class_id, year, term), the key enrolled_number is counted by
+        seat_keys = [(item.class_id, item.year, item.term) for item in enrollments]
+        results = [
+            {"index": index, "student_id": item.student_id, "class_id": item.class_id,
+             "reserved": False, "waitlist_position": None, "detail": None, "enrollment": None}
+            for index, item in enumerate(enrollments)
+        ]
+        enrolled = {
+            tuple(row) for row in self.db.query(
+                models.Enrollment.student_id, models.Enrollment.class_id, models.Enrollment.year, models.Enrollment.term
+            ).filter(
+                models.Enrollment.student_id.in_({item.student_id for item in enrollments}),
+                models.Enrollment.class_id.in_(class_ids)
+            )
+        }
+        for result, item in zip(results, enrollments):
+            if seat_keys[result["index"]] not in existing:
+                result["detail"] = "Class not found"
+                continue
+            # The unique key of Enrollment; inserting a repeat would fail the whole commit
+            enrollment_key = (item.student_id, item.class_id, item.year, item.term)
+            if enrollment_key in enrolled:
+                result["detail"] = "Already enrolled"
+            enrolled.add(enrollment_key)
+
+        if waitlist:
+            # Reserve what fits and waitlist the rest; only unknown classes and repeats can fail
+            if all_or_nothing and any(result["detail"] for result in results):
+                return False, results
+            accepted, waitlisted = [], []
+            for result in results:
+                if result["detail"]:
+                    continue
+                (accepted if self._reserve_seat(*seat_keys[result["index"]]) else waitlisted).append(result)
+            for result in waitlisted:
+                result["enrollment"] = self._waitlist(enrollments[result["index"]])
+        elif all_or_nothing:
+            seats = {}
+            for result in results:
+                if not result["detail"]:
+                    key = seat_keys[result["index"]]
+                    seats[key] = seats.get(key, 0) + 1
+            full = {key for key, count in seats.items() if key in existing and not self._reserve_seat(*key, seats=count)}
+            for result in results:
+                if seat_keys[result["index"]] in full:
+                    result["detail"] = "Class is full"
+            if any(result["detail"] for result in results):
+                self.db.rollback()
+                return False, results
+            accepted = results
+        else:
+            accepted = []
+            for result in results:
+                if result["detail"]:
+                    continue
+                if self._reserve_seat(*seat_keys[result["index"]]):
+                    accepted.append(result)
+                else:
+                    result["detail"] = "Class is full"
+
+        new_enrollments = [models.Enrollment(**enrollments[result["index"]].dict()) for result in accepted]
+        self.db.add_all(new_enrollments)
+        self._commit()
+        for result, new_enrollment in zip(accepted, new_enrollments):
+            self.db.refresh(new_enrollment)
+            result["reserved"] = True
+            result["enrollment"] = new_enrollment
+        for result in results:
+            if result["enrollment"] is not None and not result["reserved"]:
+                self.db.refresh(result["enrollment"])
+                result["waitlist_position"] = self.waitlist_position(result["enrollment"])
+        return all(result["enrollment"] is not None for result in results), results
+
     def get(self, year: int, term: str):
         """Retrieve enrollments by year and term."""
         return self.db.query(models.Enrollment).filter(models.Enrollment.year == year, models.Enrollment.term == term).all()
@@ -60,15 +296,23 @@ class EnrollmentControl:
         enrollment = self.db.query(models.Enrollment).filter(models.Enrollment.id == enrollment_id).first()
         if not enrollment:
             return None
-        old_class_id = enrollment.class_id
-        old_year = enrollment.year
-        old_term = enrollment.term
+        old_seat = (enrollment.class_id, enrollment.year, enrollment.term, self._takes_seat(enrollment.status))
         for key, value in enrollment_data.dict().items():
             setattr(enrollment, key, value)
-        self.db.commit()
+        if (enrollment.year, enrollment.term) != old_seat[1:3]:
+            self._add_tombstone(enrollment.id, *old_seat[1:3])
+        new_seat = (enrollment.class_id, enrollment.year, enrollment.term, self._takes_seat(enrollment.status))
+        # Move the seat when the class, term or a seat-holding status changed
+        if old_seat != new_seat:
+            if old_seat[3]:
+                self._adjust_enrolled_number(*old_seat[:3], -1)
+            if new_seat[3]:
+                self._adjust_enrolled_number(*new_seat[:3], 1)
+            if old_seat[3] and enrollment.status != "waitlisted":
+                self.db.flush()
+                self.promote_waitlist(*old_seat[:3])
+        self._commit()
         self.db.refresh(enrollment)
-        self._update_enrolled_number(old_class_id, old_year, old_term)  # Update old class enrolled_number
-        self._update_enrolled_number(enrollment.class_id, enrollment.year, enrollment.term)  # Update new class enrolled_number
         return enrollment
 
     def delete(self, enrollment_id: int):
@@ -76,30 +320,165 @@ class EnrollmentControl:
         enrollment = self.db.query(models.Enrollment).filter(models.Enrollment.id == enrollment_id).first()
         if not enrollment:
             return None
-        class_id = enrollment.class_id
-        year = enrollment.year
-        term = enrollment.term
         self.db.delete(enrollment)
+        self._add_tombstone(enrollment.id, enrollment.year, enrollment.term)
+        if self._takes_seat(enrollment.status):
+            self._adjust_enrolled_number(enrollment.class_id, enrollment.year, enrollment.term, -1)
+            self.db.flush()
+            self.promote_waitlist(enrollment.class_id, enrollment.year, enrollment.term)
         self.db.commit()
-        self._update_enrolled_number(class_id, year, term)  # Update enrolled_number
         return enrollment
-    def delete_by_student(self, student_id: int):
-        """Delete all enrollments for a specific student."""
-        enrollments = self.db.query(models.Enrollment).filter(models.Enrollment.student_id == student_id).all()
-        if not enrollments:
-            return None
-        for enrollment in enrollments:
-            class_id = enrollment.class_id
-            year = enrollment.year
-            term = enrollment.term
-            self.db.delete(enrollment)
+
+    def delete_by_student(self, student_id: int, commit: bool = True):
+        """Delete all enrollments for a specific student; returns the number removed."""
+        return self.delete_by_students([student_id], commit=commit)
+
+    def delete_by_students(self, student_ids: List[int], commit: bool = True):
+        """Delete all enrollments of many students with one DELETE.
+        Seats are released with one grouped count per (class, year, term), then handed to the
+        waitlists. Pass commit=False to join the caller's transaction (e.g. the student delete)."""
+        if not student_ids:
+            return 0
+        freed = (
+            self.db.query(models.Enrollment.class_id, models.Enrollment.year, models.Enrollment.term, func.count(models.Enrollment.id))
+            .filter(models.Enrollment.student_id.in_(student_ids), SEAT_TAKEN)
+            .group_by(models.Enrollment.class_id, models.Enrollment.year, models.Enrollment.term)
+            .all()
+        )
+        self.db.execute(
+            insert(models.EnrollmentTombstone).from_select(
+                ["enrollment_id", "year", "term", "deleted_at"],
+                select(models.Enrollment.id, models.Enrollment.year, models.Enrollment.term, literal(datetime.utcnow(), models.EnrollmentTombstone.deleted_at.type))
+                .where(models.Enrollment.student_id.in_(student_ids))
+            )
+        )
+        removed = self.db.execute(
+            delete(models.Enrollment)
+            .where(models.Enrollment.student_id.in_(student_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        for class_id, year, term, seats in freed:
+            self._adjust_enrolled_number(class_id, year, term, -seats)
+        for class_id, year, term, _ in freed:
+            self.promote_waitlist(class_id, year, term)
+        if commit:
+            self.db.commit()
+        return removed
+
+    @staticmethod
+    def encode_changes_cursor(at: datetime) -> str:
+        return base64.urlsafe_b64encode(at.isoformat().encode()).decode()
+
+    @staticmethod
+    def decode_changes_cursor(cursor: str) -> datetime:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+    def changes(self, year: int, term: str, since: str = None):
+        """Enrollments of a term changed after the cursor, and ids of those deleted or moved out.
+        Without a cursor, or with one older than the tombstone retention, every row is returned
+        with reset=True. Rows near the cursor may be sent twice; clients apply them by id.
+        Returns (changed, deleted_ids, next_cursor, reset)."""
+        now = datetime.utcnow()
+        since_at = self.decode_changes_cursor(since) if since else None
+        reset = since_at is None or since_at < now - timedelta(days=ENROLLMENT_TOMBSTONE_RETENTION_DAYS)
+
+        changed = self.db.query(models.Enrollment).filter(models.Enrollment.year == year, models.Enrollment.term == term)
+        deleted = []
+        if not reset:
+            changed = changed.filter(models.Enrollment.updated_at > since_at)
+            deleted = [
+                row[0] for row in self.db.query(models.EnrollmentTombstone.enrollment_id)
+                .filter(
+                    models.EnrollmentTombstone.year == year,
+                    models.EnrollmentTombstone.term == term,
+                    models.EnrollmentTombstone.deleted_at > since_at
+                )
+            ]
+        changed = changed.order_by(models.Enrollment.id).all()
+        # A row can be moved out of the term and back; report its live state only
+        live = {enrollment.id for enrollment in changed}
+        deleted = sorted(set(deleted) - live)
+
+        # Nothing stamped before next_at can still be uncommitted (see ENROLLMENT_CHANGES_SETTLE_SECONDS)
+        next_at = now - timedelta(seconds=lock_wait_seconds(self.db) + ENROLLMENT_CHANGES_SETTLE_SECONDS)
+        if since_at is not None and since_at > next_at:
+            next_at = since_at
+        return changed, deleted, self.encode_changes_cursor(next_at), reset
+
+    def prune_tombstones(self, retention_days: float = ENROLLMENT_TOMBSTONE_RETENTION_DAYS) -> int:
+        """Delete tombstones that no valid cursor can still need."""
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        removed = self.db.execute(
+            delete(models.EnrollmentTombstone).where(models.EnrollmentTombstone.deleted_at < cutoff)
+        ).rowcount
         self.db.commit()
-        
-        for enrollment in enrollments:
-            self._update_enrolled_number(enrollment.class_id, year, term)
-        
-        return enrollments
-    
+        return removed
+
+    def reconcile(self, year: int = None, term: str = None, fix: bool = True):
+        """Recount enrolled_number for every class (optionally one term) with one grouped query.
+        Returns the classes whose stored count had drifted; fixes them when fix is True."""
+        query = (
+            self.db.query(models.Class.id, models.Class.enrolled_number, func.count(models.Enrollment.id))
+            .outerjoin(models.Enrollment, and_(
+                models.Enrollment.class_id == models.Class.id,
+                models.Enrollment.year == models.Class.year,
+                models.Enrollment.term == models.Class.term,
+                SEAT_TAKEN
+            ))
+            .group_by(models.Class.id, models.Class.enrolled_number)
+        )
+        if year is not None:
+            query = query.filter(models.Class.year == year)
+        if term is not None:
+            query = query.filter(models.Class.term == term)
+
+        drift = [
+            {"class_id": class_id, "enrolled_number": stored, "actual": actual}
+            for class_id, stored, actual in query.all()
+            if (stored or 0) != actual
+        ]
+        if fix and drift:
+            mark_availability_dirty(self.db)
+        for item in drift:
+            logger.warning(f"enrolled_number drift in class {item['class_id']}: stored {item['enrolled_number']}, actual {item['actual']}")
+            if fix:
+                # Only if the count is still the one read: a seat reserved since then is kept, and
+                # the class is fixed on the next run instead
+                result = self.db.execute(
+                    update(models.Class)
+                    .where(
+                        models.Class.id == item["class_id"],
+                        func.coalesce(models.Class.enrolled_number, 0) == (item["enrolled_number"] or 0)
+                    )
+                    .values(enrolled_number=item["actual"])
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != 1:
+                    logger.info(f"enrolled_number of class {item['class_id']} changed while reconciling; left for the next run")
+        if fix and drift:
+            self.db.commit()
+        return drift
+
+    @classmethod
+    async def run_reconciliation(cls, interval: float = ENROLLMENT_RECONCILE_INTERVAL_SECONDS):
+        """Recount enrolled_number periodically for the lifetime of the app."""
+        def reconcile_all():
+            db = SessionLocal()
+            try:
+                control = cls(db)
+                control.prune_tombstones()
+                return control.reconcile()
+            finally:
+                db.close()
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                drift = await asyncio.to_thread(reconcile_all)
+                logger.info(f"enrolled_number reconciliation fixed {len(drift)} classes")
+            except Exception as e:
+                logger.error(f"Error reconciling enrolled_number: {e}")
+
     def add_request(self, email: str, message: str):
         request = models.Request(
             email=email, 
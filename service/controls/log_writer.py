@@ -0,0 +1,151 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file defines the buffered writer behind /AddLog.
+Log entries are queued in a bounded in-memory buffer and written by a background
+task in multi-row inserts. A batch that keeps failing is retried a few times and
+then written to a dead-letter file, so it can never fill the buffer. Retention is a periodic range delete on the primary key
+instead of a COUNT on every insert.
+'''
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from threading import Lock
+from sqlalchemy import insert, delete
+from sqlalchemy.orm import Session
+from ..db_config import SessionLocal
+from ..schemas import models
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Entries held in memory before /AddLog starts dropping them
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "50000"))
+# Rows per INSERT statement
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "1"))
+# Flushes a failing batch is attempted before it is moved to the dead-letter file
+LOG_MAX_ATTEMPTS = int(os.getenv("LOG_MAX_ATTEMPTS", "5"))
+# JSON lines file for batches that could not be inserted (empty drops them)
+LOG_DEAD_LETTER_PATH = os.getenv("LOG_DEAD_LETTER_PATH", "/tmp/daniel_log_dead_letter.jsonl")
+# The Log table keeps at most this many of the newest rows
+LOG_MAX_ROWS = int(os.getenv("LOG_MAX_ROWS", "10000"))
+LOG_RETENTION_INTERVAL_SECONDS = float(os.getenv("LOG_RETENTION_INTERVAL_SECONDS", "60"))
+
+
+class LogWriter:
+    def __init__(self, buffer_size: int = LOG_BUFFER_SIZE, batch_size: int = LOG_BATCH_SIZE, max_rows: int = LOG_MAX_ROWS,
+                 max_attempts: int = LOG_MAX_ATTEMPTS, dead_letter_path: str = LOG_DEAD_LETTER_PATH):
+        self.buffer = []
+        self.retries = []  # (failed attempts, entries) of batches to write before the buffer
+        self.retry_rows = 0
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self.dropped = 0
+        self.dead_lettered = 0
+        self.lock = Lock()  # guards buffer and retry_rows
+        self.flush_lock = Lock()  # keeps batches in order when flush is called from several threads
+
+    def enqueue(self, email: str, log: str) -> dict:
+        """Queue a log entry; returns the entry, or None if the buffer is full."""
+        entry = {"email": email, "log": log, "action_time": datetime.now()}
+        with self.lock:
+            if len(self.buffer) + self.retry_rows >= self.buffer_size:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Log buffer full, {self.dropped} entries dropped so far")
+                return None
+            self.buffer.append(entry)
+        return entry
+
+    def flush(self, db: Session = None) -> int:
+        """Write every queued entry, one commit per batch; returns the number of rows written.
+        A failed batch is kept for the next flush until it has failed max_attempts times."""
+        with self.flush_lock:
+            with self.lock:
+                entries, self.buffer = self.buffer, []
+            batches = self.retries + [(0, entries[start:start + self.batch_size]) for start in range(0, len(entries), self.batch_size)]
+            if not batches:
+                return 0
+            written = 0
+            retries = []
+            db_session = db or SessionLocal()
+            try:
+                for attempts, batch in batches:
+                    try:
+                        db_session.execute(insert(models.Log), batch)
+                        db_session.commit()
+                        written += len(batch)
+                    except Exception as e:
+                        db_session.rollback()
+                        attempts += 1
+                        if attempts < self.max_attempts:
+                            logger.warning(f"Writing {len(batch)} log entries failed (attempt {attempts} of {self.max_attempts}): {e}")
+                            retries.append((attempts, batch))
+                        else:
+                            self._dead_letter(batch, e)
+            finally:
+                if db is None:
+                    db_session.close()
+            self.retries = retries
+            with self.lock:
+                self.retry_rows = sum(len(batch) for _, batch in retries)
+            logger.debug(f"Flushed {written} log entries")
+            return written
+
+    def _dead_letter(self, batch: list, error: Exception):
+        """Give up on a batch: append it to the dead-letter file, or drop it if there is none."""
+        self.dead_lettered += len(batch)
+        if not self.dead_letter_path:
+            logger.error(f"Dropped {len(batch)} log entries after {self.max_attempts} failed attempts: {error}")
+            return
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for entry in batch:
+                    f.write(json.dumps(entry, default=str) + "\n")
+            logger.error(f"Moved {len(batch)} log entries to {self.dead_letter_path} after {self.max_attempts} failed attempts: {error}")
+        except OSError as e:
+            logger.error(f"Dropped {len(batch)} log entries after {self.max_attempts} failed attempts ({error}); dead-letter file failed: {e}")
+
+    def prune(self, db: Session = None) -> int:
+        """Delete everything older than the newest max_rows rows with one range delete on id."""
+        db_session = db or SessionLocal()
+        try:
+            cutoff_id = (
+                db_session.query(models.Log.id)
+                .order_by(models.Log.id.desc())
+                .offset(self.max_rows)
+                .limit(1)
+                .scalar()
+            )
+            if cutoff_id is None:
+                return 0
+            removed = db_session.execute(delete(models.Log).where(models.Log.id <= cutoff_id)).rowcount
+            db_session.commit()
+            logger.info(f"Removed {removed} old log rows to keep the newest {self.max_rows}")
+            return removed
+        finally:
+            if db is None:
+                db_session.close()
+
+    async def run(self, flush_interval: float = LOG_FLUSH_INTERVAL_SECONDS, retention_interval: float = LOG_RETENTION_INTERVAL_SECONDS):
+        """Flush the buffer and apply retention for the lifetime of the app."""
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time()
+        try:
+            while True:
+                await asyncio.sleep(flush_interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                    if loop.time() >= next_prune:
+                        next_prune = loop.time() + retention_interval
+                        await asyncio.to_thread(self.prune)
+                except Exception as e:
+                    logger.error(f"Error writing logs: {e}")
+        finally:
+            # Do not lose queued entries on shutdown
+            await asyncio.to_thread(self.flush)
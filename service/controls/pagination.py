@@ -0,0 +1,55 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file defines the keyset pagination shared by the search endpoints.
+Pages are ordered by the primary key, so the order is stable while rows are added or
+removed, and the next page starts strictly after the last id of the previous one instead
+of paying for an OFFSET. The cursor is opaque to clients.
+'''
+import json
+import base64
+import logging
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([last_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Raises ValueError for a cursor that was not made by encode_cursor."""
+    try:
+        (last_id,) = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def contains(value: str, *columns):
+    """Case-insensitive substring match on any of the columns."""
+    pattern = f"%{value.lower()}%"
+    condition = func.lower(columns[0]).like(pattern)
+    for column in columns[1:]:
+        condition = condition | func.lower(column).like(pattern)
+    return condition
+
+
+def paginate(query: Query, id_column, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None,
+             descending: bool = False, with_total: bool = False) -> dict:
+    """One page of query ordered by id_column: {"items", "next_cursor", "total"}.
+    next_cursor is None on the last page; total is only counted when asked for."""
+    total = query.order_by(None).with_entities(func.count(id_column)).scalar() if with_total else None
+    if cursor:
+        last_id = decode_cursor(cursor)
+        query = query.filter(id_column < last_id if descending else id_column > last_id)
+    items = query.order_by(id_column.desc() if descending else id_column).limit(limit + 1).all()
+    next_cursor = encode_cursor(items[limit - 1].id) if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor, "total": total}
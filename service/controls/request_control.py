@@ -5,12 +5,24 @@ from sqlalchemy.orm import Session
 from ..schemas import models, schemas_entity
 import json
 from typing import List
-from datetime import datetime 
+from datetime import datetime, timezone
 from sqlalchemy import func
 from sqlalchemy import desc
+from .pagination import DEFAULT_PAGE_SIZE, contains, paginate
+from .sparse_fields import select_fields, project, project_one
+from .search_index import TextIndex, snippet, tokens
 
 logger = logging.getLogger(__name__)
 
+# Message and memo first: snippets come from the first column that mentions the query
+REQUEST_TEXT_COLUMNS = [models.Request.message, models.Request.memo, models.Request.name,
+                        models.Request.students, models.Request.email, models.Request.phone]
+request_index = TextIndex.named(models.Request, REQUEST_TEXT_COLUMNS, filters=[models.Request.status, models.Request.request_time])
+
+def utc_naive(value: datetime):
+    """request_time is stored as naive UTC."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None and value.tzinfo else value
+
 class RequestControl:
     def __init__(self, db: Session):
         self.db = db
@@ -48,14 +60,62 @@ class RequestControl:
         request = self.db.query(models.Request).filter(models.Request.id == request_id).first()
         return request
 
-    def search(self, name: str = None):
-        """Search for requests by name ."""
+    def _search_query(self, name: str = None, status: str = None):
         query = self.db.query(models.Request)
         if name:
-            query = query.filter(
-                func.lower(models.Request.name).like(f"%{name.lower()}%") |
-                func.lower(models.Request.students).like(f"%{name.lower()}%") |
-                func.lower(models.Request.phone).like(f"%{name.lower()}%") |
-                func.lower(models.Request.email).like(f"%{name.lower()}%")
-            )
-        return query.all()
+            query = query.filter(contains(name, models.Request.name, models.Request.students, models.Request.phone, models.Request.email))
+        if status:
+            query = query.filter(models.Request.status == status)
+        return query
+
+    def search(self, name: str = None):
+        """Search for requests by name ."""
+        return self._search_query(name).all()
+
+    def search_fields(self, fields: str, name: str = None) -> bytes:
+        """search() as JSON with only the requested fields."""
+        return project(self._search_query(name), select_fields(models.Request, schemas_entity.Request, fields))
+
+    def get_fields(self, request_id: int, fields: str):
+        """get() as JSON with only the requested fields, or None if there is no such request."""
+        query = self.db.query(models.Request).filter(models.Request.id == request_id)
+        return project_one(query, select_fields(models.Request, schemas_entity.Request, fields))
+
+    def page(self, name: str = None, status: str = None,
+             limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, with_total: bool = False) -> dict:
+        """One page of requests matching the filters, newest first."""
+        return paginate(self._search_query(name, status), models.Request.id, limit, cursor, descending=True, with_total=with_total)
+
+    def text_search(self, query: str, status: str = None, since: datetime = None, until: datetime = None, limit: int = 20):
+        """Requests mentioning every word of query in any text column, best first,
+        as {"request", "score", "snippet", "highlights"}."""
+        since, until = utc_naive(since), utc_naive(until)
+
+        def accept(meta):
+            request_status, request_time = meta
+            if status and request_status != status:
+                return False
+            if since is not None and (request_time is None or request_time < since):
+                return False
+            return until is None or (request_time is not None and request_time < until)
+
+        hits = request_index.search(query, limit, accept)
+        if hits is None:  # index not built yet: unranked, newest first
+            sql = self._search_query(status=status)
+            for term in tokens(query):
+                sql = sql.filter(contains(term, *REQUEST_TEXT_COLUMNS))
+            if since is not None:
+                sql = sql.filter(models.Request.request_time >= since)
+            if until is not None:
+                sql = sql.filter(models.Request.request_time < until)
+            hits = [(0.0, request.id) for request in sql.order_by(models.Request.id.desc()).limit(limit)]
+        requests = {request.id: request for request in
+                    self.db.query(models.Request).filter(models.Request.id.in_([row_id for _, row_id in hits]))}
+        results = []
+        for score, row_id in hits:
+            request = requests.get(row_id)
+            if request is None:
+                continue
+            text, highlights = snippet([getattr(request, column.key) for column in REQUEST_TEXT_COLUMNS], query)
+            results.append({"request": request, "score": score, "snippet": text, "highlights": highlights})
+        return results
@@ -0,0 +1,143 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file defines the in-process cache of serialized reference data (consents, schedules,
+class catalog). Entries are JSON bytes ready to send, expire after a TTL and are evicted
+least-recently-used once a cache holds more than its byte budget.
+
+Keys start with the table's version from TableVersions, so a commit in any worker turns
+the old entries into misses; the owning control also clears its cache after its own writes.
+Payloads are stored as CachedBody, so the compression middleware compresses each one once.
+'''
+import os
+import time
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, List
+from fastapi import Response
+from pydantic import TypeAdapter
+from .table_versions import TableVersions
+from .compression import CachedBody
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Entries older than this are rebuilt even if no write was seen
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+# Byte budget of each cache; least recently used entries are evicted beyond it
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+
+class ResponseCache:
+    _caches = {}
+
+    def __init__(self, name: str, ttl: float = RESPONSE_CACHE_TTL_SECONDS, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (payload, expires_at), least recently used first
+        self.size = 0
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def named(cls, name: str) -> "ResponseCache":
+        """The process-wide cache with this name."""
+        if name not in cls._caches:
+            cls._caches[name] = cls(name)
+        return cls._caches[name]
+
+    @classmethod
+    def all_stats(cls) -> List[dict]:
+        return [cache.stats() for cache in cls._caches.values()]
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        if not isinstance(payload, CachedBody):
+            payload = CachedBody(payload)
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (payload, time.monotonic() + self.ttl)
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def get_or_build(self, key, build: Callable[[], bytes]) -> bytes:
+        payload = self.get(key)
+        if payload is None:
+            payload = CachedBody(build())
+            self.put(key, payload)
+        return payload
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.invalidations += 1
+
+    def _drop(self, key):
+        payload, _ = self.entries.pop(key)
+        self.size -= len(payload)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def table_version(table: str) -> int:
+    return TableVersions.get_instance().current().get(table, 0)
+
+
+_adapters = {}
+
+def serialize(schema, rows) -> bytes:
+    """ORM rows as the JSON a List[schema] response_model would produce."""
+    return _dump(List[schema], rows)
+
+
+def serialize_one(schema, row) -> bytes:
+    """One ORM row or dict as the JSON a schema response_model would produce."""
+    return _dump(schema, row)
+
+
+def _dump(schema, value) -> bytes:
+    if schema not in _adapters:
+        _adapters[schema] = TypeAdapter(schema)
+    adapter = _adapters[schema]
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def json_response(payload: bytes, response: Response = None) -> Response:
+    """Send a cached JSON body as is, keeping headers dependencies set on response (ETag)."""
+    sent = Response(content=payload, media_type="application/json")
+    if response is not None:
+        sent.headers.update(response.headers)
+    return sent
@@ -1,18 +1,46 @@
+import time
 import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
 from sqlalchemy.orm import Session
 from ..schemas import models, schemas_entity
+from .response_cache import ResponseCache, serialize, table_version
 
 logger = logging.getLogger(__name__)
 
+schedule_cache = ResponseCache.named("schedules")
+
+# Opening and closing times are entered as wall-clock times of the school
+SCHOOL_TIMEZONE = ZoneInfo("America/New_York")
+
 class ScheduleControl:
     def __init__(self, db: Session):
         self.db = db
 
+    @staticmethod
+    def current_time() -> str:
+        """Current time in the school's timezone (EST/EDT) as an ISO string."""
+        return datetime.now(SCHOOL_TIMEZONE).isoformat()
+
+    @staticmethod
+    def clock(receive_ms: int) -> dict:
+        """Server timestamps for an NTP-style exchange, plus the school's current UTC offset.
+        With t0/t3 the client's send/receive times, offset = ((receive - t0) + (transmit - t3)) / 2
+        and round trip = (t3 - t0) - (transmit - receive)."""
+        now = datetime.now(SCHOOL_TIMEZONE)
+        return {
+            "receive_ms": receive_ms,
+            "transmit_ms": time.time_ns() // 1_000_000,
+            "utc_offset_minutes": int(now.utcoffset().total_seconds() // 60),
+            "now": now.isoformat(),
+        }
+
     def add(self, schedule_data: schemas_entity.ScheduleCreate):
         """Add a new schedule to the database."""
         new_schedule = models.Schedule(**schedule_data.dict())
         self.db.add(new_schedule)
         self.db.commit()
+        schedule_cache.invalidate()
         self.db.refresh(new_schedule)
         return new_schedule
 
@@ -24,6 +52,7 @@ class ScheduleControl:
         for key, value in schedule_data.dict().items():
             setattr(schedule_instance, key, value)
         self.db.commit()
+        schedule_cache.invalidate()
         self.db.refresh(schedule_instance)
         return schedule_instance
 
@@ -34,6 +63,7 @@ class ScheduleControl:
             return None
         self.db.delete(schedule_instance)
         self.db.commit()
+        schedule_cache.invalidate()
         return schedule_instance
 
     def get(self, schedule_id: int):
@@ -45,4 +75,11 @@ class ScheduleControl:
         """Search for schedulees by name, year, or term."""
         query = self.db.query(models.Schedule)
         return query.all()
-    
\ No newline at end of file
+    
+
+    def search_json(self) -> bytes:
+        """search() serialized as JSON, served from the schedule cache."""
+        return schedule_cache.get_or_build(
+            (table_version(models.Schedule.__tablename__),),
+            lambda: serialize(schemas_entity.Schedule, self.search()),
+        )
@@ -0,0 +1,404 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file defines the in-process indexes behind name searches on students, teachers and
+users (SearchIndex) and full-text search over parent requests (TextIndex).
+
+SearchIndex is an n-gram index. Every character and every pair of adjacent characters of the indexed columns
+maps to the ids containing it. Bigrams rather than trigrams, because most Korean names are
+two or three syllables. A query reads the shortest posting list among its n-grams and
+checks each candidate against the stored text, so results are exact for the indexed data.
+Sorted lists of whole field values and of the words inside them answer exact and prefix
+matches, best first, with a bisect and a walk no longer than the result limit.
+
+TextIndex is an inverted index from words to ids. A query word also matches the indexed
+words it begins, because Korean particles attach to the word (수업 finds 수업에, 수업을).
+Results are ranked by IDF with saturated term frequency and come with a highlighted snippet.
+
+ORM writes made through SessionLocal are applied when their session commits. Bulk
+statements and other workers' writes show up as a table version the index has not
+accounted for; run_refresh() then rebuilds it in the background, but no more often than
+SEARCH_INDEX_MIN_REBUILD_SECONDS, since a full build holds the GIL for seconds on a large table
+and other workers write all through a registration rush. Until the rebuild, and until the
+first build, candidates() sends callers back to SQL LIKE, so filtered lists always match the
+table version their ETag names. Ranked search() keeps answering from the index meanwhile and
+is at most SEARCH_INDEX_MIN_REBUILD_SECONDS + SEARCH_INDEX_REFRESH_SECONDS behind another worker.
+'''
+import os
+import re
+import math
+import time
+import bisect
+import asyncio
+import logging
+import unicodedata
+from array import array
+from threading import Lock
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from ..db_config import SessionLocal, engine
+from ..schemas import models
+from .table_versions import TableVersions
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+# Least time between two rebuilds of one index; name filters use SQL while it is behind
+SEARCH_INDEX_MIN_REBUILD_SECONDS = float(os.getenv("SEARCH_INDEX_MIN_REBUILD_SECONDS", "300"))
+# Matches beyond this make candidates() give up, and the caller filters with SQL instead
+SEARCH_INDEX_MAX_CANDIDATES = int(os.getenv("SEARCH_INDEX_MAX_CANDIDATES", "2000"))
+# Indexed words a query word may expand to by prefix
+TEXT_PREFIX_EXPANSION = 50
+SNIPPET_CHARS = 160
+
+# Session.info key holding {table: {id: fields, or None for a removal}} until commit
+PENDING_KEY = "search_index_pending"
+FIELD_SEPARATOR = "\x00"
+WORD_BOUNDARY = re.compile(r"[\s@._\-]+")
+TOKEN = re.compile(r"\w+")
+
+
+def normalize(text) -> str:
+    # NFC joins decomposed Hangul jamo, so typed and stored syllables compare equal
+    return unicodedata.normalize("NFC", str(text)).casefold().strip() if text else ""
+
+
+def tokens(text: str) -> list:
+    return TOKEN.findall(normalize(text))
+
+
+def ngrams(text: str) -> set:
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    grams.discard(FIELD_SEPARATOR)
+    return {gram for gram in grams if FIELD_SEPARATOR not in gram}
+
+
+class NameState:
+    __slots__ = ("docs", "postings", "prefixes", "words")
+
+    def __init__(self):
+        self.docs = {}  # id -> normalized fields joined by FIELD_SEPARATOR
+        self.postings = {}  # n-gram -> array of ids; may hold stale ids until the next rebuild
+        self.prefixes = []  # sorted (field value, id), then sorted (word inside a field, id); same caveat
+        self.words = []
+
+
+class SearchIndex:
+    _indexes = {}
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.table = model.__tablename__
+        self.columns = columns
+        self.state = self._empty()
+        self.version = None  # table version the index reflects, None until the first build
+        self.local_commits = 0  # commits applied since then, each bumped the version by one
+        self.replaced = 0  # rows changed or removed since the last build, whose old entries linger
+        self.lock = Lock()
+        self.building = None  # changes applied during a rebuild, replayed onto its result
+        self.builds = 0
+        self.built_at = None  # time.monotonic() of the last rebuild
+
+    @classmethod
+    def named(cls, model, columns, **options) -> "SearchIndex":
+        """The process-wide index of this model's columns."""
+        table = model.__tablename__
+        if table not in cls._indexes:
+            cls._indexes[table] = cls(model, columns, **options)
+        return cls._indexes[table]
+
+    @property
+    def ready(self) -> bool:
+        return self.version is not None
+
+    def fields(self, instance) -> tuple:
+        return tuple(getattr(instance, column.key) for column in self.columns)
+
+    # The four methods below are what an index kind defines; the rest is shared
+
+    def _empty(self):
+        return NameState()
+
+    def _put(self, state: NameState, row_id: int, fields, insert=list.append) -> None:
+        values = [normalize(value) for value in fields]
+        doc = FIELD_SEPARATOR.join(values)
+        state.docs[row_id] = doc
+        for gram in ngrams(doc):
+            state.postings.setdefault(gram, array("i")).append(row_id)
+        for value in set(values):
+            if value:
+                insert(state.prefixes, (value, row_id))
+            for word in set(WORD_BOUNDARY.split(value)[1:]):
+                if word:
+                    insert(state.words, (word, row_id))
+
+    def _remove(self, state: NameState, row_id: int) -> None:
+        state.docs.pop(row_id, None)
+
+    def _finish(self, state: NameState) -> None:
+        state.prefixes.sort()
+        state.words.sort()
+
+    def _replay(self, state, changes: dict) -> None:
+        for row_id, fields in changes.items():
+            if fields is None:
+                self._remove(state, row_id)
+            else:
+                self._put(state, row_id, fields, bisect.insort)
+
+    def apply(self, changes: dict) -> None:
+        """Apply one committed transaction's {id: fields or None} to the index."""
+        with self.lock:
+            if self.building is not None:
+                self.building.append(changes)
+            self.replaced += sum(1 for row_id in changes if row_id in self.state.docs)
+            self._replay(self.state, changes)
+            self.local_commits += 1
+
+    def rebuild(self) -> None:
+        with self.lock:
+            self.building = []
+        try:
+            state = self._empty()
+            with engine.begin() as conn:  # versions are bumped after their commit, so the rows are at least this new
+                version = conn.execute(
+                    select(models.TableVersion.version).where(models.TableVersion.name == self.table)
+                ).scalar() or 0
+                for row in conn.execute(select(self.model.id, *self.columns)):
+                    self._put(state, row[0], row[1:])
+            self._finish(state)
+            with self.lock:
+                # Changes committed while reading; replaying one already read is harmless
+                for changes in self.building:
+                    self._replay(state, changes)
+                self.state = state
+                self.version, self.local_commits, self.replaced = version, 0, 0
+                self.builds += 1
+                self.built_at = time.monotonic()
+        finally:
+            self.building = None
+        logger.info(f"Built search index of {self.table}: {len(state.docs)} rows")
+
+    def is_current(self) -> bool:
+        """True when the index reflects every commit counted in the table's current version."""
+        current = TableVersions.get_instance().current().get(self.table, 0)
+        return self.ready and current == self.version + self.local_commits
+
+    def is_stale(self) -> bool:
+        """True when another writer changed the table, or lingering entries are worth compacting."""
+        if self.is_current():
+            return self.replaced > 1000 + len(self.state.docs) // 4
+        return True
+
+    def rebuild_due(self, min_interval: float = SEARCH_INDEX_MIN_REBUILD_SECONDS) -> bool:
+        """True before the first build and once min_interval has passed since the last one."""
+        return self.built_at is None or time.monotonic() - self.built_at >= min_interval
+
+    def _matches(self, text: str):
+        """Yield (id, doc) of every document containing text."""
+        grams = ngrams(text[:2]) if len(text) < 2 else {text[i:i + 2] for i in range(len(text) - 1)}
+        postings = self.state.postings
+        shortest = min((postings.get(gram, ()) for gram in grams), key=len)
+        docs = self.state.docs
+        seen = set()
+        for row_id in shortest:
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+            doc = docs.get(row_id)
+            if doc is not None and text in doc:
+                yield row_id, doc
+
+    def candidates(self, query: str):
+        """Ids of every row matching query, or None when the caller should search in SQL.
+        Answers only while the index is current, since callers send ETags of the table version."""
+        text = normalize(query)
+        if not text or FIELD_SEPARATOR in text or not self.is_current():
+            return None
+        ids = []
+        for row_id, _ in self._matches(text):
+            ids.append(row_id)
+            if len(ids) > SEARCH_INDEX_MAX_CANDIDATES:
+                return None
+        return ids
+
+    def _walk(self, entries: list, text: str, found: dict, limit: int, rank) -> None:
+        """Add ids whose entry starts with text, in entry order, until found holds limit ids."""
+        docs = self.state.docs
+        position = bisect.bisect_left(entries, (text,))
+        while len(found) < limit and position < len(entries):
+            value, row_id = entries[position]
+            position += 1
+            if not value.startswith(text):
+                break
+            doc = docs.get(row_id)
+            # Entries of removed or changed rows stay until the next rebuild
+            if row_id not in found and doc is not None and value in doc:
+                found[row_id] = rank(value)
+
+    def search(self, query: str, limit: int = 20, prefix: bool = False):
+        """Ids of the best matches, best first, or None before the first build.
+        Exact field > field prefix > word prefix > anywhere; prefix=True drops the last."""
+        text = normalize(query)
+        if not self.ready:
+            return None
+        if not text or FIELD_SEPARATOR in text:
+            return []
+        found = {}
+        self._walk(self.state.prefixes, text, found, limit, lambda value: 0 if value == text else 1)
+        self._walk(self.state.words, text, found, limit, lambda value: 2)
+        if not prefix:
+            for row_id, _ in self._matches(text):
+                if len(found) >= limit:
+                    break
+                found.setdefault(row_id, 3)
+        return sorted(found, key=found.get)
+
+    @classmethod
+    async def run_refresh(cls, interval: float = SEARCH_INDEX_REFRESH_SECONDS):
+        """Build every index at startup, then rebuild the ones other writers have changed,
+        each at most once per SEARCH_INDEX_MIN_REBUILD_SECONDS."""
+        while True:
+            for index in list(cls._indexes.values()):
+                try:
+                    if index.rebuild_due() and await asyncio.to_thread(index.is_stale):
+                        await asyncio.to_thread(index.rebuild)
+                except Exception as e:
+                    logger.error(f"Error refreshing search index of {index.table}: {e}")
+            await asyncio.sleep(interval)
+
+
+class TextState:
+    __slots__ = ("docs", "meta", "postings", "vocabulary")
+
+    def __init__(self):
+        self.docs = {}  # id -> original text fields, for snippets
+        self.meta = {}  # id -> filter column values
+        self.postings = {}  # word -> array of ids, once per occurrence; may hold stale ids
+        self.vocabulary = []  # sorted indexed words
+
+
+class TextIndex(SearchIndex):
+    def __init__(self, model, columns, filters=()):
+        self.text_columns = len(columns)
+        super().__init__(model, list(columns) + list(filters))
+
+    def _empty(self):
+        return TextState()
+
+    def _put(self, state: TextState, row_id: int, fields, insert=list.append) -> None:
+        texts = tuple(value or "" for value in fields[:self.text_columns])
+        state.docs[row_id] = texts
+        state.meta[row_id] = tuple(fields[self.text_columns:])
+        for token in tokens(" ".join(texts)):
+            postings = state.postings.get(token)
+            if postings is None:
+                postings = state.postings[token] = array("i")
+                insert(state.vocabulary, token)
+            postings.append(row_id)
+
+    def _remove(self, state: TextState, row_id: int) -> None:
+        state.docs.pop(row_id, None)
+        state.meta.pop(row_id, None)
+
+    def _finish(self, state: TextState) -> None:
+        state.vocabulary.sort()
+
+    def _expand(self, state: TextState, term: str) -> list:
+        position = bisect.bisect_left(state.vocabulary, term)
+        words = []
+        while position < len(state.vocabulary) and len(words) < TEXT_PREFIX_EXPANSION:
+            word = state.vocabulary[position]
+            if not word.startswith(term):
+                break
+            words.append(word)
+            position += 1
+        return words
+
+    def search(self, query: str, limit: int = 20, accept=None):
+        """[(score, id)] of the rows containing every query word, best first, or None before
+        the first build. accept(meta) filters on the filter columns' values."""
+        if not self.ready:
+            return None
+        state = self.state
+        terms = list(dict.fromkeys(tokens(query)))
+        if not terms:
+            return []
+        total = len(state.docs) + 1
+        scores = None
+        for term in terms:
+            frequency = {}
+            for word in self._expand(state, term):
+                postings = state.postings[word]
+                idf = math.log(1 + total / len(postings))
+                for row_id in postings:
+                    frequency[row_id] = frequency.get(row_id, 0) + idf
+            # Saturated: the tenth mention of a word adds little over the second
+            term_scores = {row_id: weight / (1 + weight / 4) for row_id, weight in frequency.items()}
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {row_id: score + term_scores[row_id] for row_id, score in scores.items() if row_id in term_scores}
+        hits = []
+        for row_id in sorted(scores, key=scores.get, reverse=True):
+            score = scores[row_id]
+            texts = state.docs.get(row_id)
+            if texts is None or (accept is not None and not accept(state.meta[row_id])):
+                continue
+            # Postings of a changed row may be stale until the next rebuild; check the current text
+            words = tokens(" ".join(texts))
+            if all(any(word.startswith(term) for word in words) for term in terms):
+                hits.append((score, row_id))
+                if len(hits) >= limit:
+                    break
+        return hits
+
+
+def snippet(texts, query: str, width: int = SNIPPET_CHARS):
+    """(snippet, [[start, end], ...]): a window of the first text mentioning a query word,
+    with the offsets of every mention inside it."""
+    terms = sorted(set(tokens(query)), key=len, reverse=True)
+    if not terms:
+        return "", []
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    for text in texts:
+        text = unicodedata.normalize("NFC", text or "")
+        first = pattern.search(text)
+        if first is None:
+            continue
+        start = max(0, first.start() - width // 3)
+        end = min(len(text), start + width)
+        lead, tail = ("…" if start > 0 else ""), ("…" if end < len(text) else "")
+        window = text[start:end]
+        highlights = [[match.start() + len(lead), match.end() + len(lead)] for match in pattern.finditer(window)]
+        return lead + window + tail, highlights
+    return "", []
+
+
+def mark_search_removed(db: Session, table: str, ids) -> None:
+    """Remove rows deleted by a bulk statement from the table's index when db commits."""
+    pending = db.info.setdefault(PENDING_KEY, {}).setdefault(table, {})
+    for row_id in ids:
+        pending[row_id] = None
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_flush(session: Session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        index = SearchIndex._indexes.get(getattr(instance, "__tablename__", None))
+        if index is None:
+            continue
+        pending = session.info.setdefault(PENDING_KEY, {}).setdefault(index.table, {})
+        pending[instance.id] = None if instance in session.deleted else index.fields(instance)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_after_commit(session: Session):
+    for table, changes in session.info.pop(PENDING_KEY, {}).items():
+        SearchIndex._indexes[table].apply(changes)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
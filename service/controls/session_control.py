@@ -4,22 +4,43 @@ This file handles the CRUD operations (Create, Read, Update, Delete) for the Tra
 This defines implementations of API functions.
 '''
 import os
+import base64
 import logging
 import requests
 from sqlalchemy.orm import Session
 from ..schemas import models, schemas_entity
 import json
 from typing import List
-from datetime import datetime 
+from datetime import datetime, timedelta
 from sqlalchemy import func
 from sqlalchemy import desc
 import csv
 from io import StringIO
-from threading import Timer, Lock
+import asyncio
+from threading import Lock
+from fastapi.concurrency import run_in_threadpool
+from .session_queue import create_session_queue
+from .log_writer import LogWriter
 
 # Initialize the logger
 logger = logging.getLogger(__name__)
 
+# Waiting room sessions expire after this many seconds without a CheckSession
+SESSION_TIMEOUT_SECONDS = int(os.getenv("SESSION_TIMEOUT_SECONDS", "300"))
+# How often the expiry task sweeps the queue
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "10"))
+# Upper bound on expiry heap items examined per lock hold, so a sweep never stalls CheckSession
+SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "2000"))
+# "memory" keeps the queue in this process; "sqlite" shares it between uvicorn workers on the host
+SESSION_QUEUE_BACKEND = os.getenv("SESSION_QUEUE_BACKEND", "memory")
+SESSION_QUEUE_PATH = os.getenv("SESSION_QUEUE_PATH", "/tmp/daniel_session_queue.sqlite")
+# Only the first N sessions in the queue are admitted into the registration flow (0 admits everyone)
+SESSION_ADMIT_LIMIT = int(os.getenv("SESSION_ADMIT_LIMIT", "25"))
+# Interval of keep-alive events on the session stream; each one counts as an access
+SESSION_STREAM_HEARTBEAT_SECONDS = int(os.getenv("SESSION_STREAM_HEARTBEAT_SECONDS", "15"))
+# How often the queue version is read for the session streams: one read per process, not per stream
+SESSION_STREAM_POLL_SECONDS = float(os.getenv("SESSION_STREAM_POLL_SECONDS", "0.5"))
+
 class SessionControl:
     _instance = None
     _initialized = False
@@ -33,19 +54,27 @@ class SessionControl:
     def __init__(self, db: Session = None):
         # Only initialize once
         if not SessionControl._initialized:
-            self.session_queue = []
-            self.index = 0
+            self.session_queue = create_session_queue(SESSION_QUEUE_BACKEND, SESSION_QUEUE_PATH)
             self.lock = Lock()  # Thread synchronization lock
             self.db = db
-            self.schedule_remove_disconnected()
+            self.session_timeout = SESSION_TIMEOUT_SECONDS
+            self.admit_limit = SESSION_ADMIT_LIMIT
+            self.log_writer = LogWriter()
+            self.queue_changed = None  # asyncio.Condition of run_queue_watch(), created on its loop
+            self.streams = 0  # open session streams in this process
             SessionControl._initialized = True
         elif db is not None:
             # Update db session for subsequent calls
             self.db = db
 
-    def schedule_remove_disconnected(self):
-        self.remove_disconnected()
-        Timer(10, self.schedule_remove_disconnected).start()
+    async def run_expiry(self, interval: int = SESSION_SWEEP_INTERVAL_SECONDS):
+        """Sweep disconnected sessions every interval seconds; runs for the lifetime of the app."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.remove_disconnected)
+            except Exception as e:
+                logger.error(f"Error removing disconnected sessions: {e}")
 
     @classmethod
     def get_instance(cls, db: Session = None):
@@ -62,130 +91,218 @@ class SessionControl:
         cls._instance = None
         cls._initialized = False
 
+    def _is_admitted_position(self, position: int) -> bool:
+        """Sessions ahead of the admission limit may use the registration flow.
+        Positions only move forward, so once admitted a session stays admitted, and
+        each session that ends or expires promotes the next one in line."""
+        return position > 0 and (self.admit_limit <= 0 or position <= self.admit_limit)
+
     def check(self, email: str, session_key: str):
         """Check if the session key is valid for the given email and return its position in the queue."""
         with self.lock:  # Thread-safe access
-            for index, session in enumerate(self.session_queue):
-                if session["email"] == email and session["session_key"] == session_key:
-                    session["last_access"] = datetime.now()                
-                    position = index + 1 # Position in the queue (1-based index)
-                    session["position"] = position 
-                    logger.info(f"Session valid for {email} with key {session_key}, position {position}")
-                    return {"valid": True, "position": position}
-            logger.warning(f"Invalid session for {email} with key {session_key}")
-            return {"valid": True, "position": -1}
+            position = self.session_queue.touch(email, session_key, datetime.now())  # Position in the queue (1-based index)
+            if position is None:
+                logger.warning(f"Invalid session for {email} with key {session_key}")
+                return {"valid": True, "position": -1, "admitted": False}
+            admitted = self._is_admitted_position(position)
+            logger.info(f"Session valid for {email} with key {session_key}, position {position}, admitted {admitted}")
+            return {"valid": True, "position": position, "admitted": admitted}
+
+    def peek(self, email: str, session_key: str):
+        """check() without recording an access, for re-reading a position after the queue changed."""
+        with self.lock:  # Thread-safe access
+            position = self.session_queue.lookup(email, session_key)
+        if position is None:
+            return {"valid": True, "position": -1, "admitted": False}
+        return {"valid": True, "position": position, "admitted": self._is_admitted_position(position)}
+
+    def is_admitted(self, email: str, session_key: str) -> bool:
+        """Check that the session exists and has been admitted from the waiting room."""
+        return self.check(email, session_key)["admitted"]
 
     def add(self, email: str):
         """ generate a random session key and add it to session queue."""
-        with self.lock:  # Thread-safe access           
-            session_data = {
-                "index": self.index,
-                "email": email,
-                "session_key": f"{self.index }-{os.urandom(16).hex()}",
-                "last_access": datetime.now(),
-                "position": len(self.session_queue) + 1
-            }
-            logger.info(f"Adding session for {email} with session_data {session_data}")
-            self.session_queue.append(session_data)
-            self.index += 1
-            logger.info(f"Session added for {email} with key {session_data['session_key']}")
+        with self.lock:  # Thread-safe access
+            session, position = self.session_queue.add(email)
+            session_data = session.to_dict(position)
+            session_data["admitted"] = self._is_admitted_position(position)
+            logger.info(f"Session added for {email} with session_data {session_data}")
             return session_data
 
     def remove(self, email: str, session_key: str):
         """Remove a session based on email and session key."""
         with self.lock:  # Thread-safe access
-            for i, session in enumerate(self.session_queue):
-                if session["email"] == email and session["session_key"] == session_key:
-                    del self.session_queue[i]
-                    logger.info(f"Session removed for {email} with key {session_key}")
-                    return True
-            logger.warning(f"Session not found for {email} with key {session_key}")
-            return False
+            if self.session_queue.remove(email, session_key) is None:
+                logger.warning(f"Session not found for {email} with key {session_key}")
+                return False
+            logger.info(f"Session removed for {email} with key {session_key}")
+            return True
 
     def remove_disconnected(self):
-        """Remove sessions that have not been accessed in the last 30 minutes."""
+        """Remove sessions that have not been accessed within the session timeout."""
+        current_time = datetime.now()
+        cutoff = current_time - timedelta(seconds=self.session_timeout)
+        removed = 0
+        while True:
+            # Sweep in batches, releasing the lock in between
+            with self.lock:  # Thread-safe access
+                sessions_to_remove = self.session_queue.expire(cutoff, limit=SESSION_SWEEP_BATCH)
+                pending = self.session_queue.has_expired(cutoff)
+                queue_empty = len(self.session_queue) == 0
+
+            for session in sessions_to_remove:
+                time_diff = (current_time - session.last_access).total_seconds()
+                logger.info(f"Removing disconnected session: email={session.email}, key={session.session_key[:8]} lastaccess={session.last_access}, inactive_time={time_diff:.1f}s")
+            removed += len(sessions_to_remove)
+            if not pending:
+                break
+
+        if removed:
+            logger.info(f"Removed {removed} disconnected sessions.")
+        else:
+            logger.info("No disconnected sessions to remove.")
+
+        if queue_empty:
+            logger.info("Session queue is empty, index reset to 0.")
+        return True
+
+    def queue_version(self):
+        """Value that changes whenever sessions leave the queue; streams recheck positions when it does."""
         with self.lock:  # Thread-safe access
-            if len(self.session_queue) == 0:
+            return self.session_queue.version()
+
+    async def run_queue_watch(self, interval: float = SESSION_STREAM_POLL_SECONDS):
+        """Wake this process's session streams when sessions leave the queue; runs for the lifetime of the app.
+        One version read per interval serves every open stream, and none is made while no stream is open."""
+        self.queue_changed = asyncio.Condition()
+        last_version = None
+        while True:
+            await asyncio.sleep(interval)
+            if not self.streams:
+                last_version = None
+                continue
+            try:
+                version = await run_in_threadpool(self.queue_version)
+            except Exception as e:
+                logger.error(f"Error reading session queue version: {e}")
+                continue
+            if last_version is not None and version != last_version:
+                async with self.queue_changed:
+                    self.queue_changed.notify_all()
+            last_version = version
+
+    async def _wait_for_change(self, timeout: float) -> bool:
+        """Wait until run_queue_watch() reports a change (True) or timeout passes (False)."""
+        if self.queue_changed is None:  # watcher not running; heartbeats only
+            await asyncio.sleep(timeout)
+            return False
+        async with self.queue_changed:
+            try:
+                await asyncio.wait_for(self.queue_changed.wait(), timeout)
                 return True
-            current_time = datetime.now()
-            
-            # Find sessions to remove
-            sessions_to_remove = [
-                session for session in self.session_queue
-                if (current_time - session["last_access"]).total_seconds() >= 5*60 # 30 min session timeout
-            ]
-            
-            # Log removed sessions
-            for session in sessions_to_remove:
-                time_diff = (current_time - session["last_access"]).total_seconds()
-                logger.info(f"Removing disconnected session: email={session['email']}, key={session['session_key'][:8]} lastaccess={session['last_access']}, inactive_time={time_diff:.1f}s")
-            
-            # Keep only active sessions
-            self.session_queue = [
-                session for session in self.session_queue
-                if (current_time - session["last_access"]).total_seconds() <  5*60 # 10 minutes session timeout
-            ]
-            
-            if sessions_to_remove:
-                logger.info(f"Removed {len(sessions_to_remove)} disconnected sessions.")
-            else:
-                logger.info("No disconnected sessions to remove.")
-
-            if len(self.session_queue) == 0:
-                self.index = 0
-                logger.info("Session queue is empty, index reset to 0.")
-            return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def stream(self, email: str, session_key: str, is_disconnected):
+        """Yield the session state when it changes, and at least every heartbeat.
+
+        Between events the stream sleeps until run_queue_watch() reports that sessions left
+        the queue, then re-reads its position without writing. Heartbeats go through check(),
+        so a connected client never expires. The stream ends when the client disconnects or
+        the session is gone.
+        """
+        loop = asyncio.get_running_loop()
+        self.streams += 1
+        try:
+            state = await run_in_threadpool(self.check, email, session_key)
+            last_sent = loop.time()
+            yield state
+            while state["position"] != -1:
+                wait = SESSION_STREAM_HEARTBEAT_SECONDS - (loop.time() - last_sent)
+                changed = wait > 0 and await self._wait_for_change(wait)
+                if await is_disconnected():
+                    return
+                if changed:
+                    fresh = await run_in_threadpool(self.peek, email, session_key)
+                    if fresh == state:
+                        continue
+                    state = fresh
+                else:
+                    state = await run_in_threadpool(self.check, email, session_key)
+                last_sent = loop.time()
+                yield state
+        finally:
+            self.streams -= 1
 
     def get_sessions(self) -> List[dict]:
         """Retrieve all sessions."""
         with self.lock:  # Thread-safe access
-            return self.session_queue.copy()  # Return a copy to avoid external modifications
+            return self.session_queue.to_list()  # Return copies to avoid external modifications
 
 
     def clear_sessions(self):
         """Clear all sessions."""
         with self.lock:  # Thread-safe access
             self.session_queue.clear()
-            self.index = 0
             logger.info("All sessions cleared.")
             return True
 
     def add_log(self, email: str, log: str, db: Session = None):
-        """Add log entry - use provided db session or instance db session"""
-        db_session = db or self.db
-        if not db_session:
-            logger.error("No database session available for add_log")
-            return None
-            
-        # Check if the Log table size exceeds 10,000
-        log_count = db_session.query(models.Log).count()
-        if log_count >= 10000:
-            oldest_log = db_session.query(models.Log).order_by(models.Log.action_time.asc()).first()
-            if oldest_log:
-                db_session.delete(oldest_log)
-                db_session.commit()
-                logger.info(f"Oldest log with ID {oldest_log.id} removed to maintain table size limit.")
-
-        # Create a new log entry using the mapped SQLAlchemy model
-        new_log = models.Log(
-            email=email,
-            log=log,
-            action_time=datetime.now()
-        )
-        db_session.add(new_log)
-        db_session.commit()
-        db_session.refresh(new_log)
-        logger.info(f"Log added for {new_log.email} with log {new_log.log}")
-        return new_log
-    
+        """Queue a log entry; the log writer task inserts it in the next batch."""
+        entry = self.log_writer.enqueue(email, log)
+        if entry is None:
+            logger.error(f"Log buffer full, dropped log for {email}")
+        return entry
+
+    def _log_query(self, db_session: Session, email: str, since: datetime = None, until: datetime = None, query: str = None):
+        """Log rows of one email, narrowed by time range and substring; served by ix_log_email_action_time."""
+        logs = db_session.query(models.Log).filter(models.Log.email == email)
+        if since:
+            logs = logs.filter(models.Log.action_time >= since)
+        if until:
+            logs = logs.filter(models.Log.action_time < until)
+        if query:
+            logs = logs.filter(models.Log.log.like(f"%{query}%"))
+        return logs
+
+    @staticmethod
+    def encode_log_cursor(log: models.Log) -> str:
+        return base64.urlsafe_b64encode(f"{log.action_time.isoformat()}|{log.id}".encode()).decode()
 
-    def get_log(self, email: str, db: Session = None) -> List[models.Log]:
-        """Retrieve logs for a specific email - use provided db session or instance db session"""
+    @staticmethod
+    def decode_log_cursor(cursor: str):
+        action_time, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(action_time), int(log_id)
+
+    def get_log(self, email: str, db: Session = None, limit: int = 100, cursor: str = None,
+                since: datetime = None, until: datetime = None, query: str = None):
+        """Retrieve one page of logs for an email, newest first.
+        Returns (logs, next_cursor); next_cursor is None on the last page."""
         db_session = db or self.db
         if not db_session:
             logger.error("No database session available for get_log")
-            return []
-            
-        logs = db_session.query(models.Log).filter(models.Log.email == email).order_by(models.Log.action_time.desc()).all()
+            return [], None
+
+        self.log_writer.flush(db_session)  # include entries still waiting in the buffer
+        logs = self._log_query(db_session, email, since, until, query)
+        if cursor:
+            # Keyset pagination: continue strictly after the last row of the previous page
+            action_time, log_id = self.decode_log_cursor(cursor)
+            logs = logs.filter(
+                (models.Log.action_time < action_time) |
+                ((models.Log.action_time == action_time) & (models.Log.id < log_id))
+            )
+        logs = logs.order_by(models.Log.action_time.desc(), models.Log.id.desc()).limit(limit + 1).all()
+        next_cursor = self.encode_log_cursor(logs[limit - 1]) if len(logs) > limit else None
+        logs = logs[:limit]
         logger.info(f"Retrieved {len(logs)} logs for email {email}.")
-        return logs
+        return logs, next_cursor
+
+    def count_log(self, email: str, db: Session = None, since: datetime = None, until: datetime = None, query: str = None) -> int:
+        """Count logs for an email with the same filters as get_log."""
+        db_session = db or self.db
+        if not db_session:
+            logger.error("No database session available for count_log")
+            return 0
+        self.log_writer.flush(db_session)
+        return self._log_query(db_session, email, since, until, query).with_entities(func.count(models.Log.id)).scalar()
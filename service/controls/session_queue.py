@@ -0,0 +1,393 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file defines the waiting room queue backends used by SessionControl.
+MemorySessionQueue keeps the queue in process memory: sessions are indexed by
+(email, session_key) for O(1) lookup, and a Fenwick tree over the admission index
+gives each session's queue position in O(log n). Expiry uses a lazy-deletion
+min-heap keyed on last_access, so a sweep only touches sessions whose last known
+access is older than the cutoff.
+SqliteSessionQueue keeps the queue in a SQLite WAL table so several uvicorn worker
+processes on one host share the same positions and expiry; the same Fenwick tree is kept
+in a table beside it, so positions there also cost O(log n) primary key lookups.
+'''
+import heapq
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class SessionEntry:
+    """A single waiting room session."""
+    __slots__ = ("index", "email", "session_key", "last_access")
+
+    def __init__(self, index: int, email: str, session_key: str, last_access: datetime):
+        self.index = index
+        self.email = email
+        self.session_key = session_key
+        self.last_access = last_access
+
+    def to_dict(self, position: int) -> dict:
+        return {
+            "index": self.index,
+            "email": self.email,
+            "session_key": self.session_key,
+            "last_access": self.last_access,
+            "position": position
+        }
+
+
+class FenwickTree:
+    """Binary indexed tree counting live sessions per admission index."""
+
+    def __init__(self, size: int, indices: List[int] = ()):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        for index in indices:
+            self.tree[index + 1] += 1
+        # Linear-time build: push every node's total up to its parent once
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index: int, delta: int):
+        """Add delta at the 0-based index."""
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, index: int) -> int:
+        """Sum of all values at 0-based indices 0..index."""
+        total = 0
+        i = index + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class SessionQueueBackend(ABC):
+    """Interface of a waiting room queue backend. Not thread-safe; callers hold their own lock."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def add(self, email: str, now: datetime = None) -> Tuple[SessionEntry, int]:
+        """Append a new session with a random key and return it with its 1-based position."""
+
+    @abstractmethod
+    def touch(self, email: str, session_key: str, now: datetime = None) -> Optional[int]:
+        """Record an access and return the 1-based position, or None if the session is unknown."""
+
+    @abstractmethod
+    def lookup(self, email: str, session_key: str) -> Optional[int]:
+        """The 1-based position without recording an access, or None if the session is unknown."""
+
+    @abstractmethod
+    def remove(self, email: str, session_key: str) -> Optional[SessionEntry]:
+        ...
+
+    @abstractmethod
+    def expire(self, cutoff: datetime, limit: int = None) -> List[SessionEntry]:
+        """Remove and return up to limit sessions whose last_access is at or before cutoff."""
+
+    @abstractmethod
+    def has_expired(self, cutoff: datetime) -> bool:
+        """True if expire(cutoff) still has work to do."""
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def version(self):
+        """Opaque value that changes whenever sessions leave the queue.
+        Joins do not change it: a new session goes behind everyone, so no position moves."""
+
+    @abstractmethod
+    def to_list(self) -> List[dict]:
+        ...
+
+
+class MemorySessionQueue(SessionQueueBackend):
+    """Waiting room queue held in this process."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.entries: Dict[Tuple[str, str], SessionEntry] = {}  # insertion order == admission order
+        self.tree = FenwickTree(capacity)
+        self.next_index = 0
+        self.expiry_heap: List[Tuple[datetime, Tuple[str, str]]] = []
+        self.changes = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[SessionEntry]:
+        return iter(self.entries.values())
+
+    def _reindex(self):
+        """Renumber live sessions from 0, growing the tree only when it is over half full."""
+        live = len(self.entries)
+        if live * 2 > self.capacity:
+            self.capacity *= 2
+        for new_index, entry in enumerate(self.entries.values()):
+            entry.index = new_index
+        self.tree = FenwickTree(self.capacity, range(live))
+        self.next_index = live
+
+    def add(self, email: str, now: datetime = None) -> Tuple[SessionEntry, int]:
+        """Append a new session with a random key and return it with its 1-based position."""
+        if self.next_index >= self.capacity:
+            self._reindex()
+        index = self.next_index
+        entry = SessionEntry(index, email, f"{index}-{os.urandom(16).hex()}", now or datetime.now())
+        key = (email, entry.session_key)
+        self.entries[key] = entry
+        heapq.heappush(self.expiry_heap, (entry.last_access, key))
+        self.tree.add(index, 1)
+        self.next_index += 1
+        return entry, len(self.entries)
+
+    def get(self, email: str, session_key: str) -> Optional[SessionEntry]:
+        return self.entries.get((email, session_key))
+
+    def position(self, entry: SessionEntry) -> int:
+        """1-based position of a live session in the queue."""
+        return self.tree.prefix_sum(entry.index)
+
+    def touch(self, email: str, session_key: str, now: datetime = None) -> Optional[int]:
+        entry = self.entries.get((email, session_key))
+        if entry is None:
+            return None
+        entry.last_access = now or datetime.now()
+        return self.position(entry)
+
+    def lookup(self, email: str, session_key: str) -> Optional[int]:
+        entry = self.entries.get((email, session_key))
+        return None if entry is None else self.position(entry)
+
+    def remove(self, email: str, session_key: str) -> Optional[SessionEntry]:
+        entry = self.entries.pop((email, session_key), None)
+        if entry is None:
+            return None
+        self.tree.add(entry.index, -1)
+        self.changes += 1
+        if not self.entries:
+            self.clear()
+        return entry
+
+    def expire(self, cutoff: datetime, limit: int = None) -> List[SessionEntry]:
+        """Remove and return sessions whose last_access is at or before cutoff.
+
+        check() only updates last_access, so heap items may be stale: an item for a
+        session that was accessed since it was pushed is re-pushed with the newer time,
+        and an item for a session that is already gone is dropped. At most limit heap
+        items are examined per call; use has_expired() to see if more remain.
+        """
+        expired = []
+        heap = self.expiry_heap
+        examined = 0
+        while heap and heap[0][0] <= cutoff and (limit is None or examined < limit):
+            examined += 1
+            _, key = heapq.heappop(heap)
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            if entry.last_access > cutoff:
+                heapq.heappush(heap, (entry.last_access, key))
+                continue
+            expired.append(entry)
+            self.remove(entry.email, entry.session_key)
+        return expired
+
+    def has_expired(self, cutoff: datetime) -> bool:
+        return bool(self.expiry_heap) and self.expiry_heap[0][0] <= cutoff
+
+    def clear(self):
+        self.entries.clear()
+        self.tree = FenwickTree(self.capacity)
+        self.next_index = 0
+        self.expiry_heap.clear()
+        self.changes += 1
+
+    def version(self) -> int:
+        return self.changes
+
+    def to_list(self) -> List[dict]:
+        return [entry.to_dict(position) for position, entry in enumerate(self.entries.values(), start=1)]
+
+
+class SqliteSessionQueue(SessionQueueBackend):
+    """Waiting room queue in a SQLite WAL database shared by every worker process on the host.
+
+    idx is an INTEGER PRIMARY KEY, so it follows admission order and restarts from 1
+    once the table is empty, like the in-memory index. session_queue_rank holds the
+    nonzero nodes of a Fenwick tree over idx, updated in the same transaction as every
+    insert and delete, so a position is one SELECT over at most 31 primary keys instead
+    of a COUNT over the queue. Expiry deletes through the last_access index, so a sweep
+    only reads the rows that actually expired.
+    """
+
+    RANK_SPAN = 1 << 31  # largest idx the tree covers; idx restarts whenever the queue empties
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # autocommit mode; writes open their own BEGIN IMMEDIATE transaction
+        self.conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_queue ("
+            "idx INTEGER PRIMARY KEY, email TEXT NOT NULL, session_key TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_session_queue_key ON session_queue (email, session_key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_session_queue_last_access ON session_queue (last_access)")
+        # Leave counter shared by all workers; add() and touch() do not bump it
+        self.conn.execute("CREATE TABLE IF NOT EXISTS session_queue_changes (id INTEGER PRIMARY KEY, changes INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO session_queue_changes (id, changes) VALUES (1, 0)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS session_queue_rank (node INTEGER PRIMARY KEY, count INTEGER NOT NULL)")
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.conn.execute("SELECT 1 FROM session_queue_rank LIMIT 1").fetchone() is None:
+                # Queue file from before the rank table existed
+                self._rank_add([row[0] for row in self.conn.execute("SELECT idx FROM session_queue")], 1)
+
+    def _rank_add(self, indices, delta: int):
+        """Add delta at each idx in the Fenwick tree table. Runs in the caller's transaction."""
+        updates = {}
+        for idx in indices:
+            node = idx
+            while node <= self.RANK_SPAN:
+                updates[node] = updates.get(node, 0) + delta
+                node += node & -node
+        self.conn.executemany(
+            "INSERT INTO session_queue_rank (node, count) VALUES (?, ?) "
+            "ON CONFLICT(node) DO UPDATE SET count = count + excluded.count",
+            updates.items()
+        )
+
+    def _removed(self, indices):
+        """Account for deleted rows; resets the tree once the queue is empty, as idx restarts."""
+        if self.conn.execute("SELECT 1 FROM session_queue LIMIT 1").fetchone() is None:
+            self.conn.execute("DELETE FROM session_queue_rank")
+        else:
+            self._rank_add(indices, -1)
+
+    def _changed(self):
+        self.conn.execute("UPDATE session_queue_changes SET changes = changes + 1 WHERE id = 1")
+
+    @staticmethod
+    def _entry(row) -> SessionEntry:
+        idx, email, session_key, last_access = row
+        return SessionEntry(idx - 1, email, session_key, datetime.fromtimestamp(last_access))
+
+    def _position(self, idx: int) -> int:
+        """Fenwick prefix sum: the live sessions with an idx up to this one."""
+        nodes = []
+        while idx > 0:
+            nodes.append(idx)
+            idx -= idx & -idx
+        return self.conn.execute(
+            f"SELECT COALESCE(SUM(count), 0) FROM session_queue_rank WHERE node IN ({','.join('?' * len(nodes))})", nodes
+        ).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM session_queue").fetchone()[0]
+
+    def add(self, email: str, now: datetime = None) -> Tuple[SessionEntry, int]:
+        now = now or datetime.now()
+        secret = os.urandom(16).hex()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            idx = self.conn.execute(
+                "INSERT INTO session_queue (email, session_key, last_access) VALUES (?, ?, ?)",
+                (email, secret, now.timestamp())
+            ).lastrowid
+            session_key = f"{idx - 1}-{secret}"
+            self.conn.execute("UPDATE session_queue SET session_key = ? WHERE idx = ?", (session_key, idx))
+            self._rank_add([idx], 1)
+            position = self._position(idx)
+        return SessionEntry(idx - 1, email, session_key, now), position
+
+    def touch(self, email: str, session_key: str, now: datetime = None) -> Optional[int]:
+        now = now or datetime.now()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT idx FROM session_queue WHERE email = ? AND session_key = ?", (email, session_key)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE session_queue SET last_access = ? WHERE idx = ?", (now.timestamp(), row[0]))
+            return self._position(row[0])
+
+    def lookup(self, email: str, session_key: str) -> Optional[int]:
+        with self.conn:
+            self.conn.execute("BEGIN")  # read-only; one snapshot for the row and its position
+            row = self.conn.execute(
+                "SELECT idx FROM session_queue WHERE email = ? AND session_key = ?", (email, session_key)
+            ).fetchone()
+            return None if row is None else self._position(row[0])
+
+    def remove(self, email: str, session_key: str) -> Optional[SessionEntry]:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT idx, email, session_key, last_access FROM session_queue WHERE email = ? AND session_key = ?",
+                (email, session_key)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("DELETE FROM session_queue WHERE idx = ?", (row[0],))
+            self._removed([row[0]])
+            self._changed()
+        return self._entry(row)
+
+    def expire(self, cutoff: datetime, limit: int = None) -> List[SessionEntry]:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT idx, email, session_key, last_access FROM session_queue "
+                "WHERE last_access <= ? ORDER BY last_access LIMIT ?",
+                (cutoff.timestamp(), -1 if limit is None else limit)
+            ).fetchall()
+            self.conn.executemany("DELETE FROM session_queue WHERE idx = ?", [(row[0],) for row in rows])
+            if rows:
+                self._removed([row[0] for row in rows])
+                self._changed()
+        return [self._entry(row) for row in rows]
+
+    def has_expired(self, cutoff: datetime) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM session_queue WHERE last_access <= ? LIMIT 1", (cutoff.timestamp(),)
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM session_queue")
+            self.conn.execute("DELETE FROM session_queue_rank")
+            self._changed()
+
+    def version(self) -> int:
+        return self.conn.execute("SELECT changes FROM session_queue_changes WHERE id = 1").fetchone()[0]
+
+    def to_list(self) -> List[dict]:
+        rows = self.conn.execute("SELECT idx, email, session_key, last_access FROM session_queue ORDER BY idx").fetchall()
+        return [self._entry(row).to_dict(position) for position, row in enumerate(rows, start=1)]
+
+
+def create_session_queue(backend: str = "memory", path: str = None) -> SessionQueueBackend:
+    """Build the queue backend selected by SESSION_QUEUE_BACKEND."""
+    if backend == "memory":
+        return MemorySessionQueue()
+    if backend == "sqlite":
+        return SqliteSessionQueue(path)
+    raise ValueError(f"Unknown session queue backend: {backend}")
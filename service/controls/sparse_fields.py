@@ -0,0 +1,47 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file implements sparse fieldsets: ?fields=id,name,grade on list and get endpoints.
+Only the requested columns are selected, and rows go straight from the result tuples to JSON
+without building ORM entities or Pydantic models.
+'''
+import logging
+from fastapi import HTTPException, Response
+from pydantic_core import to_json
+from .response_cache import json_response
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+
+def select_fields(model, schema, fields: str) -> list:
+    """Columns for a comma-separated fields parameter, id always first.
+    Only fields of the response schema are accepted, so columns it hides stay hidden.
+    Raises ValueError naming the unknown fields."""
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    columns = model.__table__.columns
+    unknown = [name for name in names if name not in schema.model_fields or name not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [getattr(model, name) for name in ["id"] + [name for name in names if name != "id"]]
+
+
+def project(query, columns) -> bytes:
+    """JSON list of {column: value} for every row of query, selecting only columns."""
+    return to_json([row._asdict() for row in query.with_entities(*columns)])
+
+
+def project_one(query, columns):
+    """JSON object of the first row of query selecting only columns, or None."""
+    row = query.with_entities(*columns).first()
+    return to_json(row._asdict()) if row is not None else None
+
+
+def fields_response(build, response: Response = None, not_found: str = "Not found") -> Response:
+    """Send the JSON build() makes for a ?fields= request: 400 for unknown fields, 404 for None."""
+    try:
+        payload = build()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if payload is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return json_response(payload, response)
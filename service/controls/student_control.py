@@ -8,17 +8,24 @@ import logging
 import requests
 from sqlalchemy.orm import Session
 from ..schemas import models, schemas_entity
+from .table_versions import mark_tables_changed
+from .pagination import DEFAULT_PAGE_SIZE, contains, paginate
+from .sparse_fields import select_fields, project, project_one
+from .search_index import SearchIndex, mark_search_removed
 import json
 from typing import List
 from datetime import datetime 
 from sqlalchemy import func
 from sqlalchemy import desc
+from sqlalchemy import delete
 import csv
 from io import StringIO
 
 # Initialize the logger
 logger = logging.getLogger(__name__)
 
+student_index = SearchIndex.named(models.Student, [models.Student.name, models.Student.email])
+
 class StudentControl:
     def __init__(self, db: Session):
         self.db = db
@@ -42,24 +49,66 @@ class StudentControl:
         self.db.refresh(student)
         return student
 
-    def delete(self, student_id: int):
+    def delete(self, student_id: int, commit: bool = True):
         """Delete a student from the database."""
         student = self.db.query(models.Student).filter(models.Student.id == student_id).first()
         if not student:
             return None
         self.db.delete(student)
-        self.db.commit()
+        if commit:
+            self.db.commit()
         return student
 
-    def search(self, name: str = None):
-        """Search for students by name or email with pagination."""
+    def delete_many(self, student_ids: List[int], commit: bool = True):
+        """Delete many students with one DELETE; returns the number removed."""
+        if not student_ids:
+            return 0
+        removed = self.db.execute(
+            delete(models.Student)
+            .where(models.Student.id.in_(student_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        mark_search_removed(self.db, models.Student.__tablename__, student_ids)
+        if commit:
+            self.db.commit()
+        return removed
+
+    def _search_query(self, name: str = None, grade: int = None, korean_level: int = None):
         query = self.db.query(models.Student)
         if name:
-            query = query.filter(
-                func.lower(models.Student.name).like(f"%{name.lower()}%") |
-                func.lower(models.Student.email).like(f"%{name.lower()}%")
-            )
-        return query.all()
+            ids = student_index.candidates(name)
+            query = query.filter(models.Student.id.in_(ids) if ids is not None else contains(name, models.Student.name, models.Student.email))
+        if grade is not None:
+            query = query.filter(models.Student.grade == grade)
+        if korean_level is not None:
+            query = query.filter(models.Student.korean_level == korean_level)
+        return query
+
+    def search(self, name: str = None):
+        """Search for students by name or email."""
+        return self._search_query(name).all()
+
+    def search_fields(self, fields: str, name: str = None) -> bytes:
+        """search() as JSON with only the requested fields."""
+        return project(self._search_query(name), select_fields(models.Student, schemas_entity.Student, fields))
+
+    def get_fields(self, student_id: int, fields: str):
+        """get() as JSON with only the requested fields, or None if there is no such student."""
+        query = self.db.query(models.Student).filter(models.Student.id == student_id)
+        return project_one(query, select_fields(models.Student, schemas_entity.Student, fields))
+
+    def page(self, name: str = None, grade: int = None, korean_level: int = None,
+             limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, with_total: bool = False) -> dict:
+        """One page of students matching the filters, ordered by id."""
+        return paginate(self._search_query(name, grade, korean_level), models.Student.id, limit, cursor, with_total=with_total)
+
+    def ranked_search(self, query: str, limit: int = 20, prefix: bool = False):
+        """Students matching query by name or email, best match first."""
+        ids = student_index.search(query, limit, prefix)
+        if ids is None:  # index not built yet
+            return self.page(name=query, limit=limit)["items"]
+        students = {student.id: student for student in self.db.query(models.Student).filter(models.Student.id.in_(ids))}
+        return [students[student_id] for student_id in ids if student_id in students]
 
     def get(self, student_id: int):
         """Retrieve a student by ID."""
@@ -91,5 +140,6 @@ class StudentControl:
                 continue
         
         self.db.bulk_save_objects(students)
+        mark_tables_changed(self.db, models.Student.__tablename__)  # bulk saves skip the flush events
         self.db.commit()
         return students
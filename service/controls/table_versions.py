@@ -0,0 +1,149 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+This file keeps a version counter per table for conditional GETs.
+Every committed session that wrote a table bumps that table's row in TableVersion right after
+its commit, in a short transaction of its own, so versions are shared by all uvicorn workers and
+never run ahead of the data. Bumping inside the writer's transaction would hold the version row
+locks until commit and queue every enrollment behind them; in the gap a reader may see new rows
+under the old version, which the weak ETags tolerate. Writes are picked up from ORM flushes and
+from insert()/update()/delete() statements run through the session; code that bypasses both
+calls mark_tables_changed().
+
+List endpoints add Depends(conditional_get("Table", ...)): the ETag is made from the versions
+and the request's path and query, and a matching If-None-Match is answered with 304 before
+the endpoint queries or serializes anything.
+'''
+import os
+import time
+import zlib
+import itertools
+import logging
+from threading import Lock
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event, update, select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..db_config import SessionLocal, engine
+from ..schemas import models
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Versions are re-read at least this often, which bounds how long another worker's commit goes unseen
+TABLE_VERSION_REFRESH_SECONDS = float(os.getenv("TABLE_VERSION_REFRESH_SECONDS", "1"))
+
+# Session.info keys holding the names of the tables written in the current transaction,
+# and of those whose versions are bumped once the commit went through
+CHANGED_KEY = "changed_tables"
+COMMITTED_KEY = "committed_tables"
+VERSION_TABLE = models.TableVersion.__tablename__
+
+
+class TableVersions:
+    _instance = None
+
+    def __init__(self, refresh_interval: float = TABLE_VERSION_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.versions = {}
+        self.loaded_at = None
+        self.lock = Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def current(self) -> dict:
+        """Version per table name, re-read with one small query when the copy is stale."""
+        now = time.monotonic()
+        if self.loaded_at is not None and now - self.loaded_at < self.refresh_interval:
+            return self.versions
+        with self.lock:
+            if self.loaded_at is None or now - self.loaded_at >= self.refresh_interval:
+                with engine.connect() as conn:
+                    rows = conn.execute(select(models.TableVersion.name, models.TableVersion.version)).all()
+                self.versions = {name: version for name, version in rows}
+                self.loaded_at = now
+        return self.versions
+
+    def expire(self):
+        """Re-read on the next call; used after a local commit so this worker sees it at once."""
+        self.loaded_at = None
+
+
+def mark_tables_changed(db: Session, *tables: str):
+    """Bump these tables' versions when db commits."""
+    db.info.setdefault(CHANGED_KEY, set()).update(table for table in tables if table != VERSION_TABLE)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _track_flush(session: Session, flush_context, instances):
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table:
+            mark_tables_changed(session, table)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_tables_changed(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+
+def bump_versions(tables):
+    """Increment the versions of tables in a short transaction of their own."""
+    for attempt in range(2):
+        try:
+            with engine.begin() as conn:
+                for table in sorted(tables):  # one lock order for every writer
+                    result = conn.execute(
+                        update(models.TableVersion)
+                        .where(models.TableVersion.name == table)
+                        .values(version=models.TableVersion.version + 1)
+                    )
+                    if result.rowcount == 0:
+                        conn.execute(insert(models.TableVersion).values(name=table, version=1))
+            return
+        except IntegrityError:
+            continue  # another worker created the row first; the update finds it now
+        except Exception as e:
+            logger.error(f"Error bumping table versions {sorted(tables)}: {e}")
+            return
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _collect_changes(session: Session):
+    # Commit flushes after this event; flush now so the flush's tables are included
+    session.flush()
+    changed = session.info.pop(CHANGED_KEY, None)
+    if changed:
+        session.info.setdefault(COMMITTED_KEY, set()).update(changed)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_versions(session: Session):
+    changed = session.info.pop(COMMITTED_KEY, None)
+    if changed:
+        bump_versions(changed)
+        TableVersions.get_instance().expire()
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_changes(session: Session, previous_transaction):
+    session.info.pop(CHANGED_KEY, None)
+    session.info.pop(COMMITTED_KEY, None)
+
+
+def conditional_get(*tables: str):
+    """Dependency for list endpoints: sets the ETag, or answers a matching If-None-Match with 304."""
+    def dependency(request: Request, response: Response):
+        versions = TableVersions.get_instance().current()
+        tag = ".".join(str(versions.get(table, 0)) for table in tables)
+        key = zlib.crc32(f"{request.url.path}?{request.url.query}".encode())
+        etag = f'W/"{tag}-{key:x}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}  # browsers revalidate every time
+        if etag in (value.strip() for value in request.headers.get("if-none-match", "").split(",")):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return dependency
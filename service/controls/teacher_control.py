@@ -8,9 +8,14 @@ from typing import List
 from datetime import datetime 
 from sqlalchemy import func
 from sqlalchemy import desc
+from .pagination import DEFAULT_PAGE_SIZE, contains, paginate
+from .sparse_fields import select_fields, project, project_one
+from .search_index import SearchIndex
 
 logger = logging.getLogger(__name__)
 
+teacher_index = SearchIndex.named(models.Teacher, [models.Teacher.name, models.Teacher.subject, models.Teacher.email])
+
 class TeacherControl:
     def __init__(self, db: Session):
         self.db = db
@@ -48,13 +53,37 @@ class TeacherControl:
         teacher = self.db.query(models.Teacher).filter(models.Teacher.id == teacher_id).first()
         return teacher
 
-    def search(self, name: str = None):
-        """Search for teachers by name ."""
+    def _search_query(self, name: str = None, subject: str = None):
         query = self.db.query(models.Teacher)
         if name:
-            query = query.filter(
-                func.lower(models.Teacher.name).like(f"%{name.lower()}%") |
-                func.lower(models.Teacher.subject).like(f"%{name.lower()}%") |
-                func.lower(models.Teacher.email).like(f"%{name.lower()}%")
-            )
-        return query.all()
+            ids = teacher_index.candidates(name)
+            query = query.filter(models.Teacher.id.in_(ids) if ids is not None else contains(name, models.Teacher.name, models.Teacher.subject, models.Teacher.email))
+        if subject:
+            query = query.filter(models.Teacher.subject == subject)
+        return query
+
+    def search(self, name: str = None):
+        """Search for teachers by name ."""
+        return self._search_query(name).all()
+
+    def search_fields(self, fields: str, name: str = None) -> bytes:
+        """search() as JSON with only the requested fields."""
+        return project(self._search_query(name), select_fields(models.Teacher, schemas_entity.Teacher, fields))
+
+    def get_fields(self, teacher_id: int, fields: str):
+        """get() as JSON with only the requested fields, or None if there is no such teacher."""
+        query = self.db.query(models.Teacher).filter(models.Teacher.id == teacher_id)
+        return project_one(query, select_fields(models.Teacher, schemas_entity.Teacher, fields))
+
+    def page(self, name: str = None, subject: str = None,
+             limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, with_total: bool = False) -> dict:
+        """One page of teachers matching the filters, ordered by id."""
+        return paginate(self._search_query(name, subject), models.Teacher.id, limit, cursor, with_total=with_total)
+
+    def ranked_search(self, query: str, limit: int = 20, prefix: bool = False):
+        """Teachers matching query by name, subject or email, best match first."""
+        ids = teacher_index.search(query, limit, prefix)
+        if ids is None:  # index not built yet
+            return self.page(name=query, limit=limit)["items"]
+        teachers = {teacher.id: teacher for teacher in self.db.query(models.Teacher).filter(models.Teacher.id.in_(ids))}
+        return [teachers[teacher_id] for teacher_id in ids if teacher_id in teachers]
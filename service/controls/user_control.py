@@ -6,6 +6,8 @@ from passlib.context import CryptContext
 from ..db_config import SessionLocal
 from sqlalchemy import func
 from sqlalchemy import desc
+from .pagination import DEFAULT_PAGE_SIZE, contains, paginate
+from .search_index import SearchIndex
 from ..schemas import models, schemas_entity
 from typing import List
 from ..logging_config import setup_logging
@@ -13,6 +15,8 @@ import logging
 import uuid
 logger = logging.getLogger(__name__)
 
+user_index = SearchIndex.named(models.User, [models.User.username, models.User.email])
+
 
 class UserControl:
     def __init__(self, db: Session):
@@ -58,14 +62,32 @@ class UserControl:
     def get_user_by_id(self, user_id: int) -> User:
         return self.db.query(User).filter(User.id == user_id).first()
 
-    def get_all_users(self, name: str = None) -> list[User]:
+    def _search_query(self, name: str = None, role: str = None, is_active: int = None):
         query = self.db.query(models.User)
         if name:
-            query = query.filter(
-                func.lower(models.User.username).like(f"%{name.lower()}%") |
-                func.lower(models.User.email).like(f"%{name.lower()}%")
-            )
-        return query.all()
+            ids = user_index.candidates(name)
+            query = query.filter(models.User.id.in_(ids) if ids is not None else contains(name, models.User.username, models.User.email))
+        if role:
+            query = query.filter(models.User.role == role)
+        if is_active is not None:
+            query = query.filter(models.User.is_active == is_active)
+        return query
+
+    def get_all_users(self, name: str = None) -> list[User]:
+        return self._search_query(name).all()
+
+    def page(self, name: str = None, role: str = None, is_active: int = None,
+             limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, with_total: bool = False) -> dict:
+        """One page of users matching the filters, ordered by id."""
+        return paginate(self._search_query(name, role, is_active), models.User.id, limit, cursor, with_total=with_total)
+
+    def ranked_search(self, query: str, limit: int = 20, prefix: bool = False):
+        """Users matching query by username or email, best match first."""
+        ids = user_index.search(query, limit, prefix)
+        if ids is None:  # index not built yet
+            return self.page(name=query, limit=limit)["items"]
+        users = {user.id: user for user in self.db.query(models.User).filter(models.User.id.in_(ids))}
+        return [users[user_id] for user_id in ids if user_id in users]
         
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         # Compare the MD5 hash of the plain password with the stored hashed password
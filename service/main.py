@@ -1,4 +1,6 @@
-﻿from fastapi import FastAPI
+﻿import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routers.student_router import router as student_router
 from .routers.class_router import router as class_router
@@ -10,7 +12,28 @@ from .routers.schedule_router import router as schedule_router
 from .routers.consent_router import router as consent_router
 from .routers.request_router import router as request_router
 from .routers.settings_router import router as settings_router
-app = FastAPI()
+from .controls.session_control import SessionControl
+from .controls.enrollment_control import EnrollmentControl
+from .controls.search_index import SearchIndex
+from .controls.compression import CompressionMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background tasks owned by the app; cancelled on shutdown
+    session_control = SessionControl.get_instance()
+    tasks = [
+        asyncio.create_task(session_control.run_expiry()),
+        asyncio.create_task(session_control.run_queue_watch()),
+        asyncio.create_task(session_control.log_writer.run()),
+        asyncio.create_task(EnrollmentControl.run_reconciliation()),
+        asyncio.create_task(SearchIndex.run_refresh()),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +42,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added after CORS so it wraps it and sees the final headers
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(student_router, tags=["Student"])
 app.include_router(class_router, tags=["Class"])
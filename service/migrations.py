@@ -0,0 +1,169 @@
+# Copyright (c) 2025 Milal Daniel Korean School.
+'''
+Versioned schema migrations for the SQLite fallback and MySQL.
+Applied versions are recorded in the SchemaVersion table, and every pending migration runs
+in order at startup. Steps check the live schema before changing it, so a migration
+that was interrupted, or that a database already satisfies, is safe to run again.
+On MySQL, indexes are built with ALGORITHM=INPLACE, LOCK=NONE, so production tables stay
+readable and writable while they are upgraded in place.
+
+    python -m service.migrations            # apply pending migrations
+    python -m service.migrations --status   # list applied and pending versions
+'''
+import argparse
+import logging
+from datetime import datetime
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, inspect, select, text, insert
+from sqlalchemy.engine import Connection, Engine
+from .db_config import engine as default_engine
+from .schemas import models
+
+# Initialize the logger
+logger = logging.getLogger(__name__)
+
+# Named lock that keeps several uvicorn workers from migrating at the same time (MySQL)
+MIGRATION_LOCK_NAME = "daniel_schema_migrations"
+MIGRATION_LOCK_TIMEOUT_SECONDS = 300
+
+class MigrationBlocked(Exception):
+    """A step found data it must not change on its own; nothing from it or later steps is applied."""
+
+
+schema_metadata = MetaData()
+schema_version = Table(
+    "SchemaVersion", schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime),
+)
+
+
+def index_exists(conn: Connection, table: str, name: str) -> bool:
+    return any(index["name"] == name for index in inspect(conn).get_indexes(table))
+
+
+def create_index(conn: Connection, table: str, name: str, columns, unique: bool = False):
+    """Create an index unless one with this name exists; online (no table lock) on MySQL."""
+    if index_exists(conn, table, name):
+        return
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    column_list = ", ".join(conn.dialect.identifier_preparer.quote(column) for column in columns)
+    statement = f"CREATE {kind} {name} ON {conn.dialect.identifier_preparer.quote(table)} ({column_list})"
+    if conn.dialect.name == "mysql":
+        statement += " ALGORITHM=INPLACE LOCK=NONE"
+    logger.info(f"Creating {kind.lower()} {name} on {table}")
+    conn.execute(text(statement))
+
+
+def create_missing_tables(conn: Connection):
+    """Baseline: every table in the models, created only where missing."""
+    models.Base.metadata.create_all(bind=conn, checkfirst=True)
+
+
+def add_hot_path_indexes(conn: Connection):
+    """Composite indexes for the filters the Controls run on every request."""
+    for table, name, columns in (
+        ("Enrollment", "ix_enrollment_class_status", ["class_id", "year", "term", "status"]),  # waitlist, seat checks
+        ("Enrollment", "ix_enrollment_term_updated", ["year", "term", "updated_at"]),  # get by term, changes feed
+        ("EnrollmentTombstone", "ix_enrollment_tombstone_term_deleted", ["year", "term", "deleted_at"]),
+        ("Class", "ix_class_year_term", ["year", "term"]),  # term listings, availability, reconcile
+        ("Log", "ix_log_email_action_time", ["email", "action_time"]),  # GetLog
+        ("Request", "ix_request_status", ["status", "request_time"]),  # open requests, newest first
+    ):
+        create_index(conn, table, name, columns)
+
+
+def add_unique_enrollment(conn: Connection):
+    """One enrollment per (student, class, year, term). Existing duplicates stop the migration
+    instead of being deleted: which row of each to keep is an admin's call."""
+    enrollment = models.Enrollment.__table__
+    other = enrollment.alias("other")
+    duplicates = conn.execute(
+        select(enrollment).where(
+            select(other.c.id).where(
+                other.c.student_id == enrollment.c.student_id, other.c.class_id == enrollment.c.class_id,
+                other.c.year == enrollment.c.year, other.c.term == enrollment.c.term, other.c.id != enrollment.c.id
+            ).exists()
+        ).order_by(enrollment.c.student_id, enrollment.c.class_id, enrollment.c.year, enrollment.c.term, enrollment.c.id)
+    ).mappings().all()
+    if duplicates:
+        rows = "\n".join(f"  {dict(row)}" for row in duplicates)
+        raise MigrationBlocked(
+            f"{len(duplicates)} enrollments share a (student_id, class_id, year, term) with another one. "
+            f"Remove the extra row of each group with DELETE /enrollment/{{id}}, which also corrects "
+            f"enrolled_number and the changes feed, then run the migrations again:\n{rows}"
+        )
+    create_index(conn, "Enrollment", "uq_enrollment_student_class_term", ["student_id", "class_id", "year", "term"], unique=True)
+
+
+def add_table_versions(conn: Connection):
+    """Per-table write counters behind the list endpoints' ETags, one row per table."""
+    models.TableVersion.__table__.create(bind=conn, checkfirst=True)
+    existing = {row[0] for row in conn.execute(select(models.TableVersion.name))}
+    missing = [name for name in models.Base.metadata.tables if name not in existing and name != models.TableVersion.__tablename__]
+    if missing:
+        conn.execute(insert(models.TableVersion.__table__), [{"name": name, "version": 0} for name in missing])
+
+
+# (version, description, step); append only, never renumber or edit an applied step
+MIGRATIONS = [
+    (1, "create missing tables", create_missing_tables),
+    (2, "hot-path composite indexes", add_hot_path_indexes),
+    (3, "unique enrollment per student, class and term", add_unique_enrollment),
+    (4, "per-table version counters", add_table_versions),
+]
+
+
+def applied_versions(conn: Connection) -> set:
+    schema_metadata.create_all(bind=conn, checkfirst=True)
+    return {row[0] for row in conn.execute(select(schema_version.c.version))}
+
+
+def run_migrations(engine: Engine = default_engine) -> list:
+    """Apply every pending migration in order; returns the versions applied."""
+    applied = []
+    with engine.connect() as lock_conn:
+        locked = engine.dialect.name == "mysql"
+        if locked:
+            lock_conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT_SECONDS})
+        try:
+            with engine.begin() as conn:
+                done = applied_versions(conn)
+            for version, description, step in MIGRATIONS:
+                if version in done:
+                    continue
+                logger.info(f"Applying schema migration {version}: {description}")
+                # MySQL commits DDL implicitly, which is why every step is written to be re-runnable
+                with engine.begin() as conn:
+                    step(conn)
+                    conn.execute(insert(schema_version), {"version": version, "description": description, "applied_at": datetime.utcnow()})
+                applied.append(version)
+        finally:
+            if locked:
+                lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+    if applied:
+        logger.info(f"Schema migrated to version {applied[-1]}")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.status:
+        with default_engine.begin() as conn:
+            done = applied_versions(conn)
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>4} {'applied' if version in done else 'pending':<8} {description}")
+        return
+    try:
+        applied = run_migrations()
+    except MigrationBlocked as e:
+        logger.error(f"Schema migration stopped: {e}")
+        raise SystemExit(1)
+    print(f"applied {applied}" if applied else "schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
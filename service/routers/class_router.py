@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..controls.class_control import ClassControl
-from ..schemas.schemas_entity import Class, ClassCreate
+from ..controls.availability_cache import AvailabilityCache
+from ..controls.table_versions import conditional_get
+from ..controls.response_cache import json_response
+from ..controls.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..controls.sparse_fields import fields_response
+from ..schemas.schemas_entity import Class, ClassCreate, ClassPage, ClassroomSnapshot
 from ..db_config import SessionLocal
 
 router = APIRouter()
@@ -36,15 +41,45 @@ def delete_class(class_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Class not found")
     return deleted_class
 
+@router.get("/classes/availability")
+def get_class_availability(year: int, term: str, version: Optional[int] = None):
+    """Seats per class of a term as {"version", "classes": [[class_id, enrolled_number, max_students], ...]}.
+    Served from an in-process snapshot; pass the last version to get 304 when nothing changed."""
+    snapshot = AvailabilityCache.get_instance().get(year, term)
+    if version is not None and version == snapshot.version:
+        return Response(status_code=304)
+    return Response(content=snapshot.payload, media_type="application/json")
+
 @router.get("/classes/{class_id}/", response_model=Class)
-def get_class(class_id: int, db: Session = Depends(get_db)):
-    """Retrieve a class by ID."""
+def get_class(class_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Retrieve a class by ID. Pass fields=id,name,... for only those columns."""
+    if fields:
+        return fields_response(lambda: ClassControl(db).get_fields(class_id, fields), not_found="Class not found")
     class_instance = ClassControl(db).get(class_id)
     if not class_instance:
         raise HTTPException(status_code=404, detail="Class not found")
     return class_instance
 
-@router.get("/classes/", response_model=List[Class])
-def search_classes(name: Optional[str] = None, year: Optional[int] = None, term: Optional[str] = None, db: Session = Depends(get_db)):
-    """Search for classes by name, year, or term."""
-    return ClassControl(db).search(name=name, year=year, term=term)
+@router.get("/classes/page", response_model=ClassPage, dependencies=[Depends(conditional_get("Class"))])
+def page_classes(name: Optional[str] = None, year: Optional[int] = None, term: Optional[str] = None, teacher_id: Optional[int] = None,
+                 grade: Optional[int] = None, korean_level: Optional[int] = None,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, with_total: bool = False, db: Session = Depends(get_db)):
+    """Page through classes matching the filters, ordered by id. Pass next_cursor back as cursor for the next page."""
+    try:
+        return ClassControl(db).page(name=name, year=year, term=term, teacher_id=teacher_id, grade=grade, korean_level=korean_level,
+                                     limit=limit, cursor=cursor, with_total=with_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/classes/snapshot", response_model=ClassroomSnapshot,
+            dependencies=[Depends(conditional_get("Class", "Enrollment", "Student"))])
+def classroom_snapshot(response: Response, year: int, term: str, name: Optional[str] = None, db: Session = Depends(get_db)):
+    """Classes of a term with their [enrollment_id, student_id, status] entries, and every student matching
+    name whether enrolled or not, for the classroom manager."""
+    return json_response(ClassControl(db).snapshot_json(year, term, name=name), response)
+
+@router.get("/classes/", response_model=List[Class], dependencies=[Depends(conditional_get("Class"))])
+def search_classes(response: Response, name: Optional[str] = None, year: Optional[int] = None, term: Optional[str] = None,
+                   fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Search for classes by name, year, or term. Pass fields=id,name,... for only those columns."""
+    return fields_response(lambda: ClassControl(db).search_json(name=name, year=year, term=term, fields=fields), response)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..controls.consent_control import ConsentControl
+from ..controls.table_versions import conditional_get
+from ..controls.response_cache import json_response
 from ..schemas.schemas_entity import Consent, ConsentCreate
 from ..db_config import SessionLocal
 from datetime import datetime, timezone, timedelta  # Import timezone and timedelta
@@ -44,8 +46,7 @@ def get_consent(consent_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Consent not found")
     return consent_instance
 
-@router.get("/consents/", response_model=List[Consent])
-def search_consentes(db: Session = Depends(get_db)):
+@router.get("/consents/", response_model=List[Consent], dependencies=[Depends(conditional_get("Consent"))])
+def search_consentes(response: Response, db: Session = Depends(get_db)):
     """Search for consent by name, year, or term."""
-    consents = ConsentControl(db).search()
-    return consents
+    return json_response(ConsentControl(db).search_json(), response)
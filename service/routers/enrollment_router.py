@@ -11,6 +11,8 @@ from typing import List, Optional
 import time
 from pathlib import Path
 from ..controls.enrollment_control import EnrollmentControl
+from ..controls.session_control import SessionControl
+from ..controls.table_versions import conditional_get
 
 router = APIRouter()
 
@@ -22,18 +24,59 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to only let sessions admitted from the waiting room enroll
+def require_admitted_session(email: str, session_key: str):
+    if not SessionControl.get_instance().is_admitted(email, session_key):
+        raise HTTPException(status_code=403, detail="Session is not admitted")
+
 @router.post("/enrollment/", response_model=schemas_entity.Enrollment)
 def create_enrollment(enrollment: schemas_entity.EnrollmentCreate, db: Session = Depends(get_db)):
     control = EnrollmentControl(db)
     return control.add(enrollment)
 
-@router.post("/enrollment_condition/", response_model=schemas_entity.Enrollment)
-def create_enrollment(enrollment: schemas_entity.EnrollmentCreate, db: Session = Depends(get_db)):
+@router.post("/enrollment_condition/", response_model=schemas_entity.EnrollmentReservation, dependencies=[Depends(require_admitted_session)])
+def create_enrollment(enrollment: schemas_entity.EnrollmentCreate, waitlist: bool = False, db: Session = Depends(get_db)):
+    control = EnrollmentControl(db)
+    return control.condition_add(enrollment, waitlist=waitlist)
+
+@router.post("/enrollment_condition/batch/", response_model=schemas_entity.EnrollmentBatchResult, dependencies=[Depends(require_admitted_session)])
+def create_enrollment_batch(batch: schemas_entity.EnrollmentBatchCreate, db: Session = Depends(get_db)):
+    """Enroll several students/classes in one transaction; success is false if any item failed."""
+    if not batch.enrollments:
+        raise HTTPException(status_code=400, detail="No enrollments given")
     control = EnrollmentControl(db)
-    return control.condition_add(enrollment)
+    success, results = control.condition_add_batch(batch.enrollments, all_or_nothing=batch.all_or_nothing, waitlist=batch.waitlist)
+    return {"success": success, "results": results}
+
+@router.get("/enrollment/changes", response_model=schemas_entity.EnrollmentChanges)
+def get_enrollment_changes(year: int, term: str, since: Optional[str] = None, db: Session = Depends(get_db)):
+    """Enrollments of a term changed since the cursor; omit since for the full term."""
+    control = EnrollmentControl(db)
+    try:
+        changed, deleted, cursor, reset = control.changes(year, term, since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"changed": changed, "deleted": deleted, "cursor": cursor, "reset": reset}
 
+@router.get("/enrollment/{enrollment_id}/waitlist", response_model=schemas_entity.WaitlistPosition)
+def get_waitlist_position(enrollment_id: int, db: Session = Depends(get_db)):
+    """Where a waitlisted enrollment stands; position is null once it has been promoted."""
+    enrollment = db.query(models.Enrollment).filter(models.Enrollment.id == enrollment_id).first()
+    if not enrollment:
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+    control = EnrollmentControl(db)
+    return {"enrollment_id": enrollment.id, "class_id": enrollment.class_id,
+            "position": control.waitlist_position(enrollment), "status": enrollment.status}
+
+
+@router.post("/enrollment/reconcile")
+def reconcile_enrollment(year: Optional[int] = None, term: Optional[str] = None, fix: bool = True, db: Session = Depends(get_db)):
+    """Recount enrolled_number per class and report (and by default fix) any drift."""
+    control = EnrollmentControl(db)
+    drift = control.reconcile(year, term, fix=fix)
+    return {"drift": drift, "fixed": fix}
 
-@router.get("/enrollment/", response_model=List[schemas_entity.Enrollment])
+@router.get("/enrollment/", response_model=List[schemas_entity.Enrollment], dependencies=[Depends(conditional_get("Enrollment"))])
 def get_enrollment(year: int, term: str, db: Session = Depends(get_db)):
     control = EnrollmentControl(db)
     enrollment = control.get(year, term)
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 from ..controls.request_control import RequestControl
 from ..controls.smtp_control import SmtpControl
-from ..schemas.schemas_entity import Request, RequestCreate, EmailRequest
+from ..controls.table_versions import conditional_get
+from ..controls.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..controls.sparse_fields import fields_response
+from ..schemas.schemas_entity import Request, RequestCreate, RequestPage, RequestSearchHit, EmailRequest
 from ..db_config import SessionLocal
 
 router = APIRouter()
@@ -46,14 +50,33 @@ def delete_request(request_id: int, db: Session = Depends(get_db)):
     return deleted_request
 
 @router.get("/requests/{request_id}/", response_model=Request)
-def get_request(request_id: int, db: Session = Depends(get_db)):
-    """Retrieve a request by ID."""
+def get_request(request_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Retrieve a request by ID. Pass fields=id,name,... for only those columns."""
+    if fields:
+        return fields_response(lambda: RequestControl(db).get_fields(request_id, fields), not_found="Request not found")
     request = RequestControl(db).get(request_id)
     if not request:
         raise HTTPException(status_code=404, detail="Request not found")
     return request
 
-@router.get("/requests/", response_model=List[Request])
-def search_requests(name: Optional[str] = None, db: Session = Depends(get_db)):
-    """Search for requests by name or email."""
+@router.get("/requests/search", response_model=List[RequestSearchHit])
+def text_search_requests(q: str, status: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                         limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db)):
+    """Full-text search over request messages, memos and contact fields, best match first, with snippets."""
+    return RequestControl(db).text_search(q, status=status, since=since, until=until, limit=limit)
+
+@router.get("/requests/page", response_model=RequestPage, dependencies=[Depends(conditional_get("Request"))])
+def page_requests(name: Optional[str] = None, status: Optional[str] = None,
+                  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, with_total: bool = False, db: Session = Depends(get_db)):
+    """Page through requests matching the filters, newest first. Pass next_cursor back as cursor for the next page."""
+    try:
+        return RequestControl(db).page(name=name, status=status, limit=limit, cursor=cursor, with_total=with_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/requests/", response_model=List[Request], dependencies=[Depends(conditional_get("Request"))])
+def search_requests(response: Response, name: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Search for requests by name or email. Pass fields=id,name,... for only those columns."""
+    if fields:
+        return fields_response(lambda: RequestControl(db).search_fields(fields, name=name), response)
     return RequestControl(db).search(name=name)
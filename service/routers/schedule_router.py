@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..controls.schedule_control import ScheduleControl
+from ..controls.response_cache import json_response
 from ..schemas.schemas_entity import Schedule, ScheduleCreate
 from ..db_config import SessionLocal
+import time
 from datetime import datetime, timezone, timedelta  # Import timezone and timedelta
 router = APIRouter()
 
@@ -47,19 +49,21 @@ def get_schedule(schedule_id: int, db: Session = Depends(get_db)):
 @router.get("/schedules/", response_model=List[Schedule])
 def search_schedulees(db: Session = Depends(get_db)):
     """Search for schedule by name, year, or term."""
-    schedules = ScheduleControl(db).search()
-    # Adjust current_time to EST with daylight saving
-    est_offset = timedelta(hours=-5)  # Standard offset for EST
-    is_dst = datetime.now().astimezone().dst() != timedelta(0)  # Check if daylight saving is active
-    current_time = datetime.now().astimezone(timezone(est_offset + (timedelta(hours=1) if is_dst else timedelta(0)))).isoformat()
-    schedules.append(Schedule(id=-1, year=0, term="", opening_time=current_time, closing_time=current_time))
-    return schedules
+    # The cached list is spliced with a fresh current-time row, so this endpoint has no ETag
+    schedules = ScheduleControl(db).search_json()
+    current_time = ScheduleControl.current_time()
+    now_row = Schedule(id=-1, year=0, term="", opening_time=current_time, closing_time=current_time).model_dump_json().encode()
+    content = schedules[:-1] + (b"," if len(schedules) > 2 else b"") + now_row + b"]"
+    return json_response(content)
 
 @router.get("/schedules/GetCurrentTime")
-def get_current_time(db: Session = Depends(get_db)):
-    """Get current time in server timezone (EST)."""
-    # Adjust current_time to EST with daylight saving
-    est_offset = timedelta(hours=-5)  # Standard offset for EST
-    is_dst = datetime.now().astimezone().dst() != timedelta(0)  # Check if daylight saving is active
-    current_time = datetime.now().astimezone(timezone(est_offset + (timedelta(hours=1) if is_dst else timedelta(0)))).isoformat()
-    return {"now": current_time}    
+async def get_current_time():
+    """Get current time in the school's timezone (EST/EDT)."""
+    current_time = ScheduleControl.current_time()
+    return {"now": current_time}
+
+@router.get("/schedules/clock")
+async def get_clock():
+    """Clock sync without a database session: sync once from the client, then count down locally."""
+    receive_ms = time.time_ns() // 1_000_000
+    return ScheduleControl.clock(receive_ms)    
@@ -1,12 +1,16 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, APIRouter
-from fastapi.responses import FileResponse
+import json
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, Request, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from ..db_config import SessionLocal
 from ..controls.session_control import SessionControl
-from ..schemas.schemas_entity import Log, LogCreate
+from ..controls.schedule_control import ScheduleControl
+from ..controls.response_cache import ResponseCache
+from ..schemas.schemas_entity import Log, LogCreate, LogPage
 from typing import List, Optional
+from datetime import datetime
 
 router = APIRouter()
 
@@ -33,6 +37,11 @@ def get_server_status(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching server status: {str(e)}")
 
+@router.get("/GetCacheStats")
+def get_cache_stats():
+    """Hit/miss counters and sizes of the in-process response caches of this worker."""
+    return {"success": True, "data": ResponseCache.all_stats()}
+
 @router.post("/StartSession")
 def start_session(email: str, db: Session = Depends(get_db)):
     try:
@@ -56,12 +65,25 @@ def check_session(email: str, session_key: str, db: Session = Depends(get_db)):
         session_control = SessionControl.get_instance(db)
         result = session_control.check(email, session_key)
         if result["valid"]:
-            return {"success": True, "message": "Session is valid", "position": result["position"]}
+            return {"success": True, "message": "Session is valid", "position": result["position"], "admitted": result["admitted"]}
         else:
             raise HTTPException(status_code=401, detail="Invalid session")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error checking session: {str(e)}")
 
+@router.get("/SessionEvents")
+async def session_events(email: str, session_key: str, request: Request):
+    """Server-Sent Events stream of queue position, admission and server time for a waiting client.
+    Replaces polling /CheckSession and /schedules/GetCurrentTime; does not use the database."""
+    session_control = SessionControl.get_instance()
+
+    async def event_stream():
+        async for state in session_control.stream(email, session_key, request.is_disconnected):
+            event = {"position": state["position"], "admitted": state["admitted"], "now": ScheduleControl.current_time()}
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.get("/GetSessionQueue")
 def get_session_queue(db: Session = Depends(get_db)):
     try:
@@ -79,16 +101,31 @@ def clear_session_queue(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing session queue: {str(e)}")
     
-@router.post("/AddLog", response_model=Log)
-def add_log(email : str, log: str, db: Session = Depends(get_db)):
-    session_control = SessionControl.get_instance(db)
-    result = session_control.add_log(email, log, db)
+@router.post("/AddLog", response_model=LogCreate)
+def add_log(email : str, log: str):
+    """Queue a log entry; it is written to the database in the background."""
+    result = SessionControl.get_instance().add_log(email, log)
+    if result is None:
+        raise HTTPException(status_code=503, detail="Log buffer is full")
     return result
 
-@router.get("/GetLog", response_model=List[Log])
-def get_log(email: str, db: Session = Depends(get_db)):
+@router.get("/GetLog", response_model=LogPage)
+def get_log(email: str, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+            since: Optional[datetime] = None, until: Optional[datetime] = None, q: Optional[str] = None,
+            db: Session = Depends(get_db)):
+    """Page through an email's logs, newest first. Pass next_cursor back as cursor for the next page."""
+    session_control = SessionControl.get_instance(db)
+    try:
+        logs, next_cursor = session_control.get_log(email, db, limit=limit, cursor=cursor, since=since, until=until, query=q)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": logs, "next_cursor": next_cursor}
+
+@router.get("/GetLogCount")
+def get_log_count(email: str, since: Optional[datetime] = None, until: Optional[datetime] = None, q: Optional[str] = None,
+                  db: Session = Depends(get_db)):
     session_control = SessionControl.get_instance(db)
-    return session_control.get_log(email, db)
+    return {"count": session_control.count_log(email, db, since=since, until=until, query=q)}
 
 @router.get("/Download_db_file")
 def download_db_file(db: Session = Depends(get_db)):
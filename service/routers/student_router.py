@@ -1,6 +1,6 @@
 ﻿# Copyright (c) 2025 Milal Daniel Korean School.
 
-from fastapi import FastAPI, Depends, HTTPException, APIRouter, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, File, UploadFile, Query, Response
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -12,9 +12,13 @@ from typing import List, Optional
 import time
 from pathlib import Path
 
+from ..migrations import run_migrations
 from ..controls.student_control import StudentControl
 from ..controls.enrollment_control import EnrollmentControl
-from ..schemas.schemas_entity import Student, StudentCreate
+from ..controls.table_versions import conditional_get
+from ..controls.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..controls.sparse_fields import fields_response
+from ..schemas.schemas_entity import Student, StudentCreate, StudentPage
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -23,8 +27,8 @@ logger.info("==================================================")
 logger.info("====          Daneil Service Begins!          ====")
 logger.info("==================================================")
 
-# Initialize database
-models.Base.metadata.create_all(bind=engine)
+# Initialize database: create or upgrade the schema in place
+run_migrations(engine)
 
 router = APIRouter()
 
@@ -61,25 +65,53 @@ def delete_student(student_id: int, db: Session = Depends(get_db)):
     """Delete a student."""
     student_control = StudentControl(db=db)
     enrollmentControl = EnrollmentControl(db=db)
-    deleted_student = student_control.delete(student_id)
+    # The student and their enrollments go in one transaction
+    deleted_student = student_control.delete(student_id, commit=False)
     enrollmentControl.delete_by_student(student_id)
     if not deleted_student:
         raise HTTPException(status_code=404, detail="Student not found")
     return deleted_student
 
+@router.post("/students/bulk_delete/", response_model=schemas_entity.StudentBulkDeleteResult)
+def delete_students(request: schemas_entity.StudentBulkDelete, db: Session = Depends(get_db)):
+    """Delete many students and all of their enrollments in one transaction (year-end cleanup)."""
+    student_control = StudentControl(db=db)
+    enrollmentControl = EnrollmentControl(db=db)
+    students = student_control.delete_many(request.student_ids, commit=False)
+    enrollments = enrollmentControl.delete_by_students(request.student_ids)
+    return {"students": students, "enrollments": enrollments}
+
 @router.get("/students/{student_id}/", response_model=Student)
-def get_student(student_id: int, db: Session = Depends(get_db)):
-    """Retrieve a student by ID."""
+def get_student(student_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Retrieve a student by ID. Pass fields=id,name,... for only those columns."""
     student_control = StudentControl(db=db)
+    if fields:
+        return fields_response(lambda: student_control.get_fields(student_id, fields), not_found="Student not found")
     student = student_control.get(student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
 
-@router.get("/students/", response_model=List[Student])
-def search_students(name: Optional[str] = None, db: Session = Depends(get_db)):
-    """Search for students by name or email."""
+@router.get("/students/search", response_model=List[Student])
+def ranked_search_students(q: str, limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), prefix: bool = False, db: Session = Depends(get_db)):
+    """Ranked student search for type-ahead; prefix=true keeps only matches at the start of a name or word."""
+    return StudentControl(db=db).ranked_search(q, limit=limit, prefix=prefix)
+
+@router.get("/students/page", response_model=StudentPage, dependencies=[Depends(conditional_get("Student"))])
+def page_students(name: Optional[str] = None, grade: Optional[int] = None, korean_level: Optional[int] = None,
+                  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, with_total: bool = False, db: Session = Depends(get_db)):
+    """Page through students matching the filters, ordered by id. Pass next_cursor back as cursor for the next page."""
+    try:
+        return StudentControl(db=db).page(name=name, grade=grade, korean_level=korean_level, limit=limit, cursor=cursor, with_total=with_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/students/", response_model=List[Student], dependencies=[Depends(conditional_get("Student"))])
+def search_students(response: Response, name: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Search for students by name or email. Pass fields=id,name,... for only those columns."""
     student_control = StudentControl(db=db)
+    if fields:
+        return fields_response(lambda: student_control.search_fields(fields, name=name), response)
     return student_control.search(name=name)
 
 @router.post("/students/upload_csv/")
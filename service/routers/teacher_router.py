@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..controls.teacher_control import TeacherControl
-from ..schemas.schemas_entity import Teacher, TeacherCreate
+from ..controls.table_versions import conditional_get
+from ..controls.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..controls.sparse_fields import fields_response
+from ..schemas.schemas_entity import Teacher, TeacherCreate, TeacherPage
 from ..db_config import SessionLocal
 
 router = APIRouter()
@@ -37,14 +40,32 @@ def delete_teacher(teacher_id: int, db: Session = Depends(get_db)):
     return deleted_teacher
 
 @router.get("/teachers/{teacher_id}/", response_model=Teacher)
-def get_teacher(teacher_id: int, db: Session = Depends(get_db)):
-    """Retrieve a teacher by ID."""
+def get_teacher(teacher_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Retrieve a teacher by ID. Pass fields=id,name,... for only those columns."""
+    if fields:
+        return fields_response(lambda: TeacherControl(db).get_fields(teacher_id, fields), not_found="Teacher not found")
     teacher = TeacherControl(db).get(teacher_id)
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     return teacher
 
-@router.get("/teachers/", response_model=List[Teacher])
-def search_teachers(name: Optional[str] = None, db: Session = Depends(get_db)):
-    """Search for teachers by name or email."""
+@router.get("/teachers/search", response_model=List[Teacher])
+def ranked_search_teachers(q: str, limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), prefix: bool = False, db: Session = Depends(get_db)):
+    """Ranked teacher search for type-ahead; prefix=true keeps only matches at the start of a name or word."""
+    return TeacherControl(db).ranked_search(q, limit=limit, prefix=prefix)
+
+@router.get("/teachers/page", response_model=TeacherPage, dependencies=[Depends(conditional_get("Teacher"))])
+def page_teachers(name: Optional[str] = None, subject: Optional[str] = None,
+                  limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, with_total: bool = False, db: Session = Depends(get_db)):
+    """Page through teachers matching the filters, ordered by id. Pass next_cursor back as cursor for the next page."""
+    try:
+        return TeacherControl(db).page(name=name, subject=subject, limit=limit, cursor=cursor, with_total=with_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/teachers/", response_model=List[Teacher], dependencies=[Depends(conditional_get("Teacher"))])
+def search_teachers(response: Response, name: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Search for teachers by name or email. Pass fields=id,name,... for only those columns."""
+    if fields:
+        return fields_response(lambda: TeacherControl(db).search_fields(fields, name=name), response)
     return TeacherControl(db).search(name=name)
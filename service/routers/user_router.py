@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from ..schemas import schemas_entity
 from ..schemas.models import User
 from ..controls.user_control import UserControl
+from ..controls.table_versions import conditional_get
+from ..controls.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from ..db_config import SessionLocal
 from typing import List, Optional
 
@@ -28,6 +30,21 @@ def create_new_user(user: schemas_entity.UserCreate, db: Session = Depends(get_d
     user_control = UserControl(db=db)
     return user_control.create_user( user)
 
+# Declared before /users/{user_id}, which would otherwise match "search" and "page"
+@router.get("/users/search", response_model=list[schemas_entity.User])
+def ranked_search_users(q: str, limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), prefix: bool = False, db: Session = Depends(get_db)):
+    """Ranked user search for type-ahead; prefix=true keeps only matches at the start of a name or word."""
+    return UserControl(db=db).ranked_search(q, limit=limit, prefix=prefix)
+
+@router.get("/users/page", response_model=schemas_entity.UserPage, dependencies=[Depends(conditional_get("User"))])
+def page_users(name: Optional[str] = None, role: Optional[str] = None, is_active: Optional[int] = None,
+               limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, with_total: bool = False, db: Session = Depends(get_db)):
+    """Page through users matching the filters, ordered by id. Pass next_cursor back as cursor for the next page."""
+    try:
+        return UserControl(db=db).page(name=name, role=role, is_active=is_active, limit=limit, cursor=cursor, with_total=with_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/users/{user_id}", response_model=schemas_entity.User)
 def get_user(user_id: int, db: Session = Depends(get_db)):
     user_control = UserControl(db=db)
@@ -36,7 +53,7 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-@router.get("/users/", response_model=list[schemas_entity.User])
+@router.get("/users/", response_model=list[schemas_entity.User], dependencies=[Depends(conditional_get("User"))])
 def list_users(name: Optional[str] = None, db: Session = Depends(get_db)):
     user_control = UserControl(db=db)
     return user_control.get_all_users( name=name)
@@ -1,6 +1,7 @@
 ﻿# Copyright (c) 2025 Milal Daniel Korean School.
+# New indexes and constraints also need a step in service/migrations.py to reach existing databases.
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, TEXT  # Updated import
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, TEXT, Index  # Updated import
 from sqlalchemy.orm import relationship
 from ..db_config import Base
 from datetime import datetime
@@ -35,6 +36,9 @@ class Student(Base):
 
 class Class(Base):
     __tablename__ = "Class"
+    __table_args__ = (
+        Index("ix_class_year_term", "year", "term"),  # term listings, availability, reconcile
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String(100), index=True)
@@ -69,6 +73,11 @@ class User(Base):
 
 class Enrollment(Base):
     __tablename__ = "Enrollment"
+    __table_args__ = (
+        Index("ix_enrollment_class_status", "class_id", "year", "term", "status"),  # per-class waitlist, oldest first
+        Index("ix_enrollment_term_updated", "year", "term", "updated_at"),  # /enrollment/changes feed
+        Index("uq_enrollment_student_class_term", "student_id", "class_id", "year", "term", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     student_id = Column(Integer)
@@ -81,6 +90,20 @@ class Enrollment(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class EnrollmentTombstone(Base):
+    """Marks an enrollment that left a term (deleted or moved) so /enrollment/changes can report it."""
+    __tablename__ = "EnrollmentTombstone"
+    __table_args__ = (
+        Index("ix_enrollment_tombstone_term_deleted", "year", "term", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    enrollment_id = Column(Integer)
+    year = Column(Integer)
+    term = Column(String(20))
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Schedule(Base):
     __tablename__ = "Schedule"
     
@@ -102,14 +125,27 @@ class Consent(Base):
 
 class Log(Base):
     __tablename__ = "Log"
+    __table_args__ = (
+        Index("ix_log_email_action_time", "email", "action_time"),  # GetLog filters by email, newest first
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     email = Column(String(255))
     log = Column(TEXT)
     action_time = Column(DateTime)
 
+class TableVersion(Base):
+    """Write counter per table, bumped on commit; list endpoints build their ETags from it."""
+    __tablename__ = "TableVersion"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0)
+
 class Request(Base):
     __tablename__ = "Request"
+    __table_args__ = (
+        Index("ix_request_status", "status", "request_time"),  # open requests, newest first
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     email = Column(String(255))
@@ -2,7 +2,7 @@
 
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 
 class TeacherBase(BaseModel):
     name: Optional[str] = None
@@ -19,6 +19,11 @@ class Teacher(TeacherBase):
     class Config:
         from_attributes = True
 
+class TeacherPage(BaseModel):
+    items: List[Teacher]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # only when with_total is set
+
 
 class StudentBase(BaseModel):
     name: Optional[str] = None
@@ -44,6 +49,18 @@ class Student(StudentBase):
     class Config:
         orm_mode = True
 
+class StudentPage(BaseModel):
+    items: List[Student]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # only when with_total is set
+
+class StudentBulkDelete(BaseModel):
+    student_ids: List[int]
+
+class StudentBulkDeleteResult(BaseModel):
+    students: int  # student rows removed
+    enrollments: int  # enrollment rows removed with them
+
 
 class ClassBase(BaseModel):
     name: Optional[str] = None
@@ -72,6 +89,27 @@ class Class(ClassBase):
     class Config:
         orm_mode = True
 
+class ClassPage(BaseModel):
+    items: List[Class]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # only when with_total is set
+
+class ClassroomClass(Class):
+    enrollments: List[Tuple[int, int, Optional[str]]] = []  # [enrollment_id, student_id, status] per enrollment in the class
+
+class ClassroomStudent(BaseModel):
+    id: int
+    name: Optional[str] = None
+    grade: Optional[int] = None
+    korean_level: Optional[int] = None
+    parent_name: Optional[str] = None
+
+class ClassroomSnapshot(BaseModel):
+    year: int
+    term: str
+    classes: List[ClassroomClass]
+    students: List[ClassroomStudent]  # every student matching the name filter, enrolled or not
+
 class UserBase(BaseModel):
     username: Optional[str] = None
     email: Optional[str] = None
@@ -89,6 +127,11 @@ class User(UserBase):
     class Config:
         orm_mode = True
 
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # only when with_total is set
+
 class EnrollmentBase(BaseModel):
     student_id: Optional[int] = None
     class_id: Optional[int] = None
@@ -107,6 +150,40 @@ class Enrollment(EnrollmentBase):
     class Config:
         orm_mode = True
 
+class EnrollmentReservation(Enrollment):
+    reserved: bool = False  # True when a seat in the class was taken for this enrollment
+    waitlist_position: Optional[int] = None  # 1-based place on the class waitlist when it was full
+
+class EnrollmentBatchCreate(BaseModel):
+    enrollments: List[EnrollmentCreate]
+    all_or_nothing: bool = True  # False keeps the items that fit
+    waitlist: bool = False  # True waitlists items of full classes instead of failing them
+
+class EnrollmentBatchItem(BaseModel):
+    index: int
+    student_id: Optional[int] = None
+    class_id: Optional[int] = None
+    reserved: bool = False
+    waitlist_position: Optional[int] = None
+    detail: Optional[str] = None
+    enrollment: Optional[Enrollment] = None
+
+class EnrollmentBatchResult(BaseModel):
+    success: bool
+    results: List[EnrollmentBatchItem]
+
+class EnrollmentChanges(BaseModel):
+    changed: List[Enrollment]  # rows inserted or updated since the cursor
+    deleted: List[int]  # ids deleted or moved to another term since the cursor
+    cursor: str  # pass back as since on the next call
+    reset: bool = False  # True when changed is the whole term; drop any cached rows first
+
+class WaitlistPosition(BaseModel):
+    enrollment_id: int
+    class_id: Optional[int] = None
+    position: Optional[int] = None  # None once the enrollment has left the waitlist
+    status: Optional[str] = None
+
 class ScheduleBase(BaseModel):
     year: Optional[int] = None
     term: Optional[str] = None
@@ -148,6 +225,10 @@ class Log(LogBase):
     class Config:
         orm_mode = True
 
+class LogPage(BaseModel):
+    items: List[Log]
+    next_cursor: Optional[str] = None
+
 class RequestBase(BaseModel):
     email: Optional[str] = None
     name: Optional[str] = None
@@ -166,6 +247,17 @@ class Request(RequestBase):
     class Config:
         orm_mode = True
 
+class RequestSearchHit(BaseModel):
+    request: Request
+    score: float
+    snippet: str
+    highlights: List[List[int]]  # [start, end) offsets of the query words in snippet
+
+class RequestPage(BaseModel):
+    items: List[Request]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None  # only when with_total is set
+
 class EmailRequest(BaseModel):
     receiver: str
     title: str
@@ -36,5 +36,13 @@ fi
 # Start Apache in the background
 apache2ctl -D FOREGROUND &
 
+# Bring the schema up to date once, before any worker starts
+python -m workspace.migrations
+
 # Start Uvicorn
-uvicorn workspace.main:app --host 0.0.0.0 --port 8080
+# Several workers need the shared waiting room queue instead of the per-process one
+UVICORN_WORKERS=${UVICORN_WORKERS:-1}
+if [ "$UVICORN_WORKERS" -gt 1 ]; then
+    export SESSION_QUEUE_BACKEND=${SESSION_QUEUE_BACKEND:-sqlite}
+fi
+uvicorn workspace.main:app --host 0.0.0.0 --port 8080 --workers $UVICORN_WORKERS
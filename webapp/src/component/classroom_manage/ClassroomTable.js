@@ -56,7 +56,7 @@ export default function ClassroomTable({ search, year, term }) {
         
         const intervalId = setInterval(() => {
             student_control.getStudentsClassroomManager(search);
-            enrollment_control.getEnrollment(year, term);
+            enrollment_control.syncEnrollment(year, term);
             class_control.getClasses(null, year, term);
         }, 3000);
 
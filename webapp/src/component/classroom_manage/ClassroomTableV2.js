@@ -55,21 +55,34 @@ export default function ClassroomTableV2({ search, year, term }) {
         const enrollment_control = new EnrollmentCtrl(window.APIURL);
         const class_control = new ClassesCtrl(window.APIURL);
         
-        const intervalId = setInterval(() => {
-            student_control.getStudentsClassroomManager(search);
-            enrollment_control.getEnrollment(year, term);
-            class_control.getClasses(null, year, term);
-        }, 3000);
+        let active = true;
+        const refresh = () => {
+            if (year === 'all' || term === 'all' || !year || !term) {
+                student_control.getStudentsClassroomManager(search);
+                enrollment_control.getEnrollment(year, term);
+                class_control.getClasses(null, year, term);
+                return;
+            }
+            // One pre-joined snapshot instead of separate student, enrollment and class lists
+            class_control.getClassroomSnapshot(year, term, search)
+                .then(({ classes, enrollments, students }) => {
+                    if (!active) return; // search, year or term changed meanwhile
+                    onStudentListChange(students);
+                    onEnrollmentListChange(enrollments);
+                    onClassListChange(classes);
+                })
+                .catch(error => Logger.error("Error fetching classroom snapshot:", error));
+        };
 
-        student_control.getStudentsClassroomManager(search);
-        enrollment_control.getEnrollment(year, term);
-        class_control.getClasses(null, year, term);
+        const intervalId = setInterval(refresh, 3000);
+        refresh();
 
         EventPublisher.addEventListener(EventDef.onStudentListChange, MODULE, onStudentListChange);
         EventPublisher.addEventListener(EventDef.onEnrollmentListChange, MODULE, onEnrollmentListChange);
         EventPublisher.addEventListener(EventDef.onClassListChange, MODULE, onClassListChange);
 
         return () => {
+            active = false;
             clearInterval(intervalId);
             EventPublisher.removeEventListener(EventDef.onStudentListChange, MODULE);
             EventPublisher.removeEventListener(EventDef.onEnrollmentListChange, MODULE);
@@ -117,9 +130,10 @@ export default function ClassroomTableV2({ search, year, term }) {
         const processedData = data.map((student) => ({
             ...student,
             grade: Defines.gradeOptions.find((grade) => grade.value === student.grade)?.label || student.grade,
-            religion: Resource.get('students.' + (student.religion || '')),
-            created_at: dayjs(student.created_at).format('YYYY-MM-DD HH:mm:ss'),
-            updated_at: dayjs(student.updated_at).format('YYYY-MM-DD HH:mm:ss'),
+            // Snapshot students carry only id, name, grade, korean_level and parent_name
+            ...('religion' in student && { religion: Resource.get('students.' + (student.religion || '')) }),
+            ...('created_at' in student && { created_at: dayjs(student.created_at).format('YYYY-MM-DD HH:mm:ss') }),
+            ...('updated_at' in student && { updated_at: dayjs(student.updated_at).format('YYYY-MM-DD HH:mm:ss') }),
         }));
         setStudentList(processedData); // Update user list state with formatted data
     };
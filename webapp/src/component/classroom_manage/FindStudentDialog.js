@@ -20,9 +20,11 @@ import SessionManager from '../../control/SessionManager';
 
 export default function FindStudentDialog({ classId, onClose, onAddStudent }) {
   const [studentList, setStudentList] = useState([]); // State for user list
+  const [nextCursor, setNextCursor] = useState(null); // Set while more students match than are loaded
   const [selectionStudent, setSelectionStudent] = React.useState([]);
   const MODULE = 'FindStudentDialog';
   const [search, setSearch] = React.useState(SessionManager.getSearchWord(MODULE));
+  const searchRef = React.useRef(search); // Latest search, to drop pages of an older one
 
   const handleSearchChange = async (event) => {
     const control = new StuidentCtrl(window.APIURL);
@@ -30,13 +32,25 @@ export default function FindStudentDialog({ classId, onClose, onAddStudent }) {
       return;
     }
     setSearch(event.target.value);
+    searchRef.current = event.target.value;
     console.log("handleSearchChange Search text changed:", event.target.value);
     const result = await control.getStudentsSync(event.target.value); // Await the async function
     console.log('handleSearchChange students_ : ', result.search, result.students);
-    if(result.search !== event.target.value) {
+    if(result.search !== searchRef.current) {
       return;
     }
     setStudentList(result.students);
+    setNextCursor(result.next_cursor);
+  };
+
+  const handleLoadMore = async () => {
+    const control = new StuidentCtrl(window.APIURL);
+    const result = await control.getStudentsSync(searchRef.current, nextCursor);
+    if (!result || result.search !== searchRef.current) {
+      return;
+    }
+    setStudentList(students => students.concat(result.students));
+    setNextCursor(result.next_cursor);
   };
 
   useEffect(() => {
@@ -45,6 +59,7 @@ export default function FindStudentDialog({ classId, onClose, onAddStudent }) {
       const result = await control.getStudentsSync(SessionManager.getSearchWord(MODULE));
       if (result) {
         setStudentList(result.students);
+        setNextCursor(result.next_cursor);
       }
     };
     fetchStudents();
@@ -130,7 +145,16 @@ export default function FindStudentDialog({ classId, onClose, onAddStudent }) {
                 }
               }}
             />
-
+            {nextCursor && (
+              <Stack direction="row" spacing={1} alignItems="center" justifyContent="flex-end" sx={{ mt: 1 }}>
+                <Typography variant="body2">
+                  {Resource.get('classroom.more_students', studentList.length)}
+                </Typography>
+                <Button variant="outlined" onClick={handleLoadMore}>
+                  {Resource.get('classroom.load_more')}
+                </Button>
+              </Stack>
+            )}
           </DialogContentText>
         </DialogContent>
         <DialogActions>
@@ -67,7 +67,7 @@ export default function EnrollmentStudentTable({ search, year, term }) {
         student_control.getStudentsEnrollment(search);
         enrollment_control.getEnrollment(year, term);
         const intervalId = setInterval(() => {
-            enrollment_control.getEnrollment(year, term);
+            enrollment_control.syncEnrollment(year, term);
         }, 3000); // Refresh every 60 seconds
 
         class_control.getClassesForEnrollment(null, year, term);
@@ -24,20 +24,26 @@ export default function Blocked() {
 
     const [openingTime, setOpeningTime] = React.useState(RegisterCtrl.openingDate);
     const [closingTime, setClosingTime] = React.useState(RegisterCtrl.closingDate);
-    const [currentTime, setCurrentTime] = React.useState(new Date(new Date().getTime() + (RegisterCtrl.timeCompensation || 0)));
+    const [currentTime, setCurrentTime] = React.useState(ScheduleCtrl.now());
     const MODULE = 'Blocked';
+    const CLOCK_RESYNC_MS = 10 * 60 * 1000; // drift and DST changes; the countdown itself is local
 
     useEffect(() => {
         EventPublisher.addEventListener(EventDef.onScheduleListChange, MODULE, onScheduleListChange);
-        const intervalId = setInterval(async () => {
-            const serverTime = await new ScheduleCtrl(window.APIURL).getCurrentTime();
-            const temp = serverTime.split('.')[0];
-            console.log('Server Time:', temp, new Date(temp));
-            const present =  new Date(temp);
-            
+        const schedule_control = new ScheduleCtrl(window.APIURL);
+        if (!ScheduleCtrl.clock) {
+            schedule_control.syncClock();
+        }
+        const resyncId = setInterval(() => {
+            // the session stream already keeps the clock current while it is open
+            if (Date.now() - ScheduleCtrl.observedAt > CLOCK_RESYNC_MS) {
+                schedule_control.syncClock();
+            }
+        }, CLOCK_RESYNC_MS);
+        const intervalId = setInterval(() => {
+            const present = ScheduleCtrl.now();
             setCurrentTime(present);
 
-            console.log('Current Time:', present);
             if (RegisterCtrl.openingDate <= present && present <= RegisterCtrl.closingDate) {
                 EventPublisher.publish(EventDef.onMenuChanged, 'Welcome');
             }
@@ -45,6 +51,7 @@ export default function Blocked() {
 
         return () => {
             clearInterval(intervalId);
+            clearInterval(resyncId);
             EventPublisher.removeEventListener(EventDef.onScheduleListChange, MODULE);
         };
 
@@ -53,7 +53,7 @@ export default function EnrollmentRegister() {
 
     const fetchData = () => {
       const class_control = new ClassesCtrl(window.APIURL);
-      class_control.getClasses(null, RegisterCtrl.year, RegisterCtrl.term);
+      class_control.refreshAvailability(RegisterCtrl.year, RegisterCtrl.term);
       const teacher_control = new TeachersCtrl(window.APIURL);
       teacher_control.getTeachers();
       const enrollment_control = new EnrollmentCtrl(window.APIURL);
@@ -113,10 +113,9 @@ export default function Register() {
     console.log('Closing Time:', closingDate);
 
 
-    const serverTime = await new ScheduleCtrl(window.APIURL).getCurrentTime();
-    const temp = serverTime.split('.')[0];
-    console.log('Server Time:', temp, new Date(temp));
-    const currentDate = new Date(temp);
+    await new ScheduleCtrl(window.APIURL).syncClock();
+    const currentDate = ScheduleCtrl.now();
+    console.log('Server Time:', currentDate);
     console.log('Closing Time:', closingDate);
     RegisterCtrl.timeGap = new Date(openingTime).getTime() - currentDate.getTime();
     RegisterCtrl.currentDateTime = currentDate;
@@ -247,8 +247,13 @@ export default function SelectClasses({ onNext, onPrev }) {
 
         try {
 
-            for (const enrollment of enrollments) {
-                await enrollment_control.conditionAddEnrollmentSync(enrollment);
+            if (enrollments.length) {
+                // A class that filled up since the page loaded puts the student on its waitlist
+                const results = await enrollment_control.conditionAddEnrollmentsSync(enrollments, RegisterCtrl.parent_email, RegisterCtrl.session_key, true);
+                for (const result of results.filter(r => r.waitlist_position)) {
+                    const className = RegisterCtrl.classes.find(c => Number(c.id) === Number(result.class_id))?.name || 'Unknown';
+                    alert(Resource.get('register.enrollment_waitlisted', className, result.waitlist_position));
+                }
             }
 
             // Remove previous enrollments for the selected student
@@ -270,14 +275,7 @@ export default function SelectClasses({ onNext, onPrev }) {
             const className = RegisterCtrl.classes.find(c => Number(c.id) === Number(enrollmentData.class_id))?.name || 'Unknown';
             alert(Resource.get('register.enrollment_fail', className));
 
-            for (const enrollment of enrollments) {
-                try {
-                    await enrollment_control.deleteEnrollmentSync(enrollment.id);
-                }
-                catch (error) {
-                    console.error('Error during enrollment removal:', error);
-                }
-            }
+            // The batch is all or nothing, so there is nothing to roll back here
             enrollment_control.getEnrollment(RegisterCtrl.year, RegisterCtrl.term);
         }
 
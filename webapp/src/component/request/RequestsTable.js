@@ -104,13 +104,27 @@ export default function RequestsTable({search}) {
       document.body.removeChild(link);
     }
 
+    const renderSnippet = (row) => {
+        const parts = [];
+        let last = 0;
+        row.highlights.forEach(([start, end], i) => {
+            parts.push(row.snippet.slice(last, start));
+            parts.push(<mark key={i}>{row.snippet.slice(start, end)}</mark>);
+            last = end;
+        });
+        parts.push(row.snippet.slice(last));
+        return <span title={row.message}>{parts}</span>;
+    };
+
     const columns = [
         
         { field: 'name', headerName: Resource.get('requests.name'), width: 100 },
         { field: 'students', headerName: Resource.get('requests.students'), width: 150 },
         { field: 'email', headerName: Resource.get('requests.email'), width: 200 },
         { field: 'phone', headerName: Resource.get('requests.phone'), width: 130 },
-        { field: 'message', headerName: Resource.get('requests.message'), width: 300 },
+        { field: 'message', headerName: Resource.get('requests.message'), width: 300,
+            renderCell: (params) => params.row.snippet ? renderSnippet(params.row) : params.value
+        },
         { field: 'memo', headerName: Resource.get('requests.memo'), width: 250 },
         { field: 'request_time', headerName: Resource.get('requests.request_time'), width: 200,
             renderCell: (params) => {
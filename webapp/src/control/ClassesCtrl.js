@@ -8,6 +8,9 @@ import SessionManager from "./SessionManager";
 
 const API_URL = `${window.APIURL}/classes/`; // Ensure trailing slash
 
+// Last full class list and availability version per "year|term", shared by every ClassesCtrl instance
+const availabilityStates = new Map();
+
 export default class ClassesCtrl {
   #url = "http://localhost"
   constructor(url) {
@@ -45,6 +48,45 @@ export default class ClassesCtrl {
       .catch(error => Logger.error("Error fetching classes:", error));
   }
 
+  // Refresh seat counts from the small availability snapshot; the full list is fetched only once
+  async refreshAvailability(year, term) {
+    const key = `${year}|${term}`;
+    const state = availabilityStates.get(key);
+    try {
+      if (!state) {
+        const response = await axios.get(this.#url + "/classes", { params: { year: year, term: term } });
+        availabilityStates.set(key, { version: null, classes: response.data });
+        EventPublisher.publish(EventDef.onClassListChange, response.data);
+        return;
+      }
+      const response = await axios.get(this.#url + "/classes/availability", {
+        params: { year: year, term: term, version: state.version },
+        validateStatus: status => status === 200 || status === 304,
+      });
+      if (response.status === 304) return;
+      const seats = new Map(response.data.classes.map(([id, enrolled, max]) => [id, { enrolled, max }]));
+      if (seats.size !== state.classes.length || state.classes.some(c => !seats.has(c.id))) {
+        availabilityStates.delete(key); // classes were added or removed; reload the full list next time
+        return;
+      }
+      state.version = response.data.version;
+      state.classes = state.classes.map(c => ({ ...c, enrolled_number: seats.get(c.id).enrolled, max_students: seats.get(c.id).max }));
+      EventPublisher.publish(EventDef.onClassListChange, state.classes);
+    } catch (error) {
+      Logger.error("Error fetching class availability:", error);
+    }
+  }
+
+  // Classes, enrollments and enrolled students of a term in one request; unchanged snapshots revalidate as 304
+  async getClassroomSnapshot(year, term, search = '') {
+    const response = await axios.get(this.#url + "/classes/snapshot", { params: { year: year, term: term, name: search || null } });
+    const { classes, students } = response.data;
+    const enrollments = [];
+    classes.forEach(classItem => classItem.enrollments.forEach(([id, studentId, status]) =>
+      enrollments.push({ id: id, class_id: classItem.id, student_id: studentId, status: status, year: year, term: term })));
+    return { classes, enrollments, students };
+  }
+
   addClass(classData, search = '') {
     Logger.debug('Adding new class:', classData);
     axios
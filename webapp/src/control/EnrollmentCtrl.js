@@ -7,6 +7,9 @@ import { EventDef } from '../framework/event/EventDef';
 
 const API_URL = `${window.APIURL}/enrollment/`; // Ensure trailing slash
 
+// Rows and change cursor per "year|term", shared by every EnrollmentCtrl instance
+const syncStates = new Map();
+
 export default class EnrollmentCtrl {
   #url = "http://localhost"
   constructor(url) {
@@ -27,6 +30,35 @@ export default class EnrollmentCtrl {
       .catch(error => Logger.error("Error fetching enrollment:", error));
   }
 
+  // Poll the term's change feed and publish the merged list only when something changed
+  syncEnrollment(year, term) {
+    if (year === 'all' || term === 'all' || !year || !term) {
+      this.getEnrollment(year, term);
+      return;
+    }
+    const key = `${year}|${term}`;
+    const state = syncStates.get(key) || { cursor: null, rows: new Map() };
+
+    axios
+      .get(this.#url + "/enrollment/changes", { params: { year: year, term: term, since: state.cursor } })
+      .then(response => {
+        const { changed, deleted, cursor, reset } = response.data;
+        if (reset) state.rows.clear();
+        changed.forEach(enrollment => state.rows.set(enrollment.id, enrollment));
+        deleted.forEach(id => state.rows.delete(id));
+        state.cursor = cursor;
+        syncStates.set(key, state);
+        if (reset || changed.length || deleted.length) {
+          const enrollments = Array.from(state.rows.values()).sort((a, b) => a.id - b.id);
+          EventPublisher.publish(EventDef.onEnrollmentListChange, enrollments);
+        }
+      })
+      .catch(error => {
+        Logger.error("Error syncing enrollment:", error);
+        syncStates.delete(key); // start over with a full load next time
+      });
+  }
+
   addEnrollment(enrollmentData) {
     Logger.debug('Adding new enrollment:', enrollmentData);
     axios
@@ -51,10 +83,11 @@ export default class EnrollmentCtrl {
     }
   }
   
-  async conditionAddEnrollmentSync(enrollmentData) {
+  async conditionAddEnrollmentSync(enrollmentData, email, session_key) {
     Logger.debug('Adding new enrollment:', enrollmentData);
     try{
-      const response = await axios.post(`${this.#url}/enrollment_condition/`, enrollmentData); // Ensure trailing slash
+      // Only sessions admitted from the waiting room may enroll
+      const response = await axios.post(`${this.#url}/enrollment_condition/`, enrollmentData, { params: { email: email, session_key: session_key } }); // Ensure trailing slash
       Logger.debug("Enrollment added successfully:", response.data);
       this.getEnrollment(enrollmentData.year, enrollmentData.term);
     } catch (error) {
@@ -62,6 +95,24 @@ export default class EnrollmentCtrl {
     }
   }
 
+  async conditionAddEnrollmentsSync(enrollments, email, session_key, waitlist = false) {
+    Logger.debug('Adding enrollments in one batch:', enrollments);
+    let response;
+    try {
+      // All or nothing: the server writes none of them unless every class has a seat (or a waitlist place)
+      response = await axios.post(`${this.#url}/enrollment_condition/batch/`, { enrollments: enrollments, all_or_nothing: true, waitlist: waitlist }, { params: { email: email, session_key: session_key } });
+    } catch (error) {
+      throw enrollments[0];
+    }
+    if (!response.data.success) {
+      const failed = response.data.results.find(result => result.detail);
+      throw enrollments[failed ? failed.index : 0];
+    }
+    Logger.debug("Enrollments added successfully:", response.data);
+    if (enrollments.length) this.getEnrollment(enrollments[0].year, enrollments[0].term);
+    return response.data.results;
+  }
+
   async updateEnrollmentSync(enrollmentId, enrollmentData) {
     try {
       const response = await axios.put(`${this.#url}/enrollment/${enrollmentId}`, enrollmentData); // Ensure trailing slash
@@ -23,6 +23,7 @@ class RegisterCtrlObj {
   year = 0;
   term = '';
   sessionCheckInterval = null;
+  sessionEvents = null;
   waitingPosition = 0;
   selectedClassPeriod1 = null;
   selectedClassPeriod2 = null;
@@ -94,39 +95,82 @@ class RegisterCtrlObj {
           EventPublisher.publish(EventDef.onWaitingPosition, response.data.position);
           this.waitingPosition = response.data.position;
         }
-        // start timer to check session status every 5 seconds
-        this.sessionCheckInterval = setInterval(() => {
-          console.log("Checking session status...", this.parent_email, this.session_key);
-          if (this.parent_email == null || !this.session_key == null) {
-            EventPublisher.publish(EventDef.onMenuChanged, 'Login');
-            clearInterval(this.sessionCheckInterval);
-            return;
-          }
-          axios.post(window.APIURL + "/CheckSession?email=" + this.parent_email + "&session_key=" + this.session_key)
-            .then(response => {
-              console.log("Session status checked:", response.data, this.waitingPosition);
-              if (response.data.position === -1) {
-                Logger.debug("Session ended, redirecting to login");
-                this.cleanUpSession();
-                EventPublisher.publish(EventDef.onMenuChanged, 'Login');
-                clearInterval(this.sessionCheckInterval);
-                return;
-              }
-              if (this.waitingPosition != response.data.position) {
-                EventPublisher.publish(EventDef.onWaitingPosition, response.data.position);
-                this.waitingPosition = response.data.position;
-              }
-            })
-            .catch(error => {
-              Logger.error("Error checking session status:", error);
-            });
-        }, 5 * 1000); // 5 seconds
+        this.watchSession();
       })
       .catch(error => {
         Logger.error("Error starting session:", error);
       });
   }
 
+  onSessionState(data) {
+    if (data.now) {
+      SchedulesCtrl.observeServerTime(data.now);
+    }
+    if (data.position === -1) {
+      Logger.debug("Session ended, redirecting to login");
+      this.cleanUpSession();
+      EventPublisher.publish(EventDef.onMenuChanged, 'Login');
+      return;
+    }
+    if (this.waitingPosition != data.position) {
+      EventPublisher.publish(EventDef.onWaitingPosition, data.position);
+      this.waitingPosition = data.position;
+    }
+  }
+
+  watchSession() {
+    // server pushes position changes over one connection; fall back to polling if streaming fails
+    if (window.EventSource) {
+      const url = window.APIURL + "/SessionEvents?email=" + encodeURIComponent(this.parent_email) + "&session_key=" + encodeURIComponent(this.session_key);
+      this.sessionEvents = new EventSource(url);
+      this.sessionEvents.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        console.log("Session event:", data, this.waitingPosition);
+        this.onSessionState(data);
+      };
+      this.sessionEvents.onerror = (error) => {
+        Logger.error("Session event stream failed, polling instead:", error);
+        this.stopWatchingSession();
+        if (this.session_key) {
+          this.pollSession();
+        }
+      };
+      return;
+    }
+    this.pollSession();
+  }
+
+  pollSession() {
+    // start timer to check session status every 5 seconds
+    this.sessionCheckInterval = setInterval(() => {
+      console.log("Checking session status...", this.parent_email, this.session_key);
+      if (this.parent_email == null || !this.session_key == null) {
+        EventPublisher.publish(EventDef.onMenuChanged, 'Login');
+        clearInterval(this.sessionCheckInterval);
+        return;
+      }
+      axios.post(window.APIURL + "/CheckSession?email=" + this.parent_email + "&session_key=" + this.session_key)
+        .then(response => {
+          console.log("Session status checked:", response.data, this.waitingPosition);
+          this.onSessionState(response.data);
+        })
+        .catch(error => {
+          Logger.error("Error checking session status:", error);
+        });
+    }, 5 * 1000); // 5 seconds
+  }
+
+  stopWatchingSession() {
+    if (this.sessionEvents) {
+      this.sessionEvents.close();
+      this.sessionEvents = null;
+    }
+    if (this.sessionCheckInterval) {
+      clearInterval(this.sessionCheckInterval);
+      this.sessionCheckInterval = null;
+    }
+  }
+
   cleanUpSession() {
     Logger.debug('Cleaning up session');
     // call /session/EndSession API
@@ -141,10 +185,7 @@ class RegisterCtrlObj {
 
     }
 
-    if (this.sessionCheckInterval) {
-      clearInterval(this.sessionCheckInterval);
-      this.sessionCheckInterval = null;
-    }
+    this.stopWatchingSession();
     this.parent_email = '';
     this.session_key = '';
     this.parent_email = null;
@@ -25,14 +25,29 @@ export default class RequestsCtrl {
   
   getRequests(search) {
     Logger.debug('fetchRequests');
+    if (search) {
+      this.searchRequests(search);
+      return;
+    }
     axios
-      .get(this.#url + "/requests", { params: { name: search } })
+      .get(this.#url + "/requests")
       .then(response => {
         EventPublisher.publish(EventDef.onRequestListChange, response.data);
       })
       .catch(error => Logger.error("Error fetching requests:", error));
   }
 
+  // Full-text search over messages and memos; rows carry the matching snippet and its highlights
+  searchRequests(search, limit = 200) {
+    axios
+      .get(this.#url + "/requests/search", { params: { q: search, limit: limit } })
+      .then(response => {
+        const rows = response.data.map(hit => ({ ...hit.request, snippet: hit.snippet, highlights: hit.highlights }));
+        EventPublisher.publish(EventDef.onRequestListChange, rows);
+      })
+      .catch(error => Logger.error("Error searching requests:", error));
+  }
+
   updateRequest(requestId, requestData, search = '') {
     Logger.debug('Updating request:', requestId, requestData);
     axios
@@ -6,6 +6,11 @@ import EventPublisher from '../framework/event/EventPublisher';
 import { EventDef } from '../framework/event/EventDef';
 
 export default class ScheduleCtrl {
+  // Result of the last syncClock(): { offset, rtt, utcOffsetMinutes } in ms / minutes
+  static clock = null;
+  // Date.now() of the last server time pushed on the session stream
+  static observedAt = 0;
+
   #url = "http://localhost"
   constructor(url) {
     this.#url = url;
@@ -55,16 +60,53 @@ export default class ScheduleCtrl {
     this.getSchedules(); // Refresh the schedule list
   }
 
-  async getCurrentTime() {
-    Logger.info('Fetching current time from server');
-    try {
-      const response = await axios.get(`${this.#url}/schedules/GetCurrentTime`);
-      Logger.info('Current time fetched:', response.data.now);
-      return response.data.now;
-    } catch (error) {
-      Logger.error('Error fetching current time:', error);
-      return null;
+  // NTP-style sync: keep the sample with the shortest round trip, then count locally with now()
+  async syncClock(samples = 3) {
+    let best = null;
+    for (let i = 0; i < samples; i++) {
+      try {
+        const sent = Date.now();
+        const response = await axios.get(`${this.#url}/schedules/clock`);
+        const received = Date.now();
+        const { receive_ms, transmit_ms, utc_offset_minutes } = response.data;
+        const rtt = (received - sent) - (transmit_ms - receive_ms);
+        const offset = ((receive_ms - sent) + (transmit_ms - received)) / 2;
+        if (!best || rtt < best.rtt) {
+          best = { offset, rtt, utcOffsetMinutes: utc_offset_minutes };
+        }
+      } catch (error) {
+        Logger.error('Error syncing clock:', error);
+      }
+    }
+    if (best) {
+      Logger.info('Clock synced:', best);
+      ScheduleCtrl.clock = best;
+    }
+    return ScheduleCtrl.clock;
+  }
+
+  // Adopt the server time pushed on /SessionEvents instead of syncing over HTTP. The sample is
+  // one-way (off by the delivery delay), so it only replaces the clock when it is off by more
+  // than a second or the school's UTC offset changed (DST)
+  static observeServerTime(now) {
+    const serverMs = Date.parse(now);
+    const zone = /([+-])(\d{2}):(\d{2})$/.exec(now);
+    if (isNaN(serverMs) || !zone) return;
+    const utcOffsetMinutes = (zone[1] === '-' ? -1 : 1) * (parseInt(zone[2], 10) * 60 + parseInt(zone[3], 10));
+    const offset = serverMs - Date.now();
+    const clock = ScheduleCtrl.clock;
+    if (!clock || Math.abs(clock.offset - offset) > 1000 || clock.utcOffsetMinutes !== utcOffsetMinutes) {
+      ScheduleCtrl.clock = { offset, rtt: null, utcOffsetMinutes };
     }
+    ScheduleCtrl.observedAt = Date.now();
+  }
+
+  // Server time as a Date whose local fields show the school's wall clock
+  static now() {
+    const clock = ScheduleCtrl.clock;
+    if (!clock) return new Date();
+    const serverNow = Date.now() + clock.offset;
+    return new Date(serverNow + (clock.utcOffsetMinutes + new Date(serverNow).getTimezoneOffset()) * 60000);
   }
 
 }
@@ -162,10 +162,11 @@ class SessionManagerObj {
       });
   }
 
-  async get_log(email) {
+  // returns one page { items, next_cursor }; pass next_cursor back to get the next page
+  async get_log(email, cursor = null) {
     try {
       const response = await axios.get(window.APIURL + "/GetLog", {
-      params: { email: email }
+      params: { email: email, cursor: cursor }
       });
       return response.data;
     } catch (error) {
@@ -57,12 +57,19 @@ export default class StudentCtrl {
       .catch(error => Logger.error("Error fetching students:", error));
   }
 
-  async getStudentsSync(search = '') {
-    console.log('getStudentsSync: ', search);
+  // One page of matching students; filters: { name, grade, korean_level }. Pass the returned next_cursor for more.
+  async getStudentsPage(filters = {}, cursor = null, limit = 100) {
+    const response = await axios.get(this.#url + "/students/page", { params: { ...filters, cursor: cursor, limit: limit } });
+    return response.data;
+  }
+
+  // One page of students matching search; pass the returned next_cursor to get the next page
+  async getStudentsSync(search = '', cursor = null) {
+    console.log('getStudentsSync: ', search, cursor);
     try {
-      const response = await axios.get(this.#url + "/students", { params: { name: search } });
-      console.log("getStudentsSync Students:", search, response.data);
-      return {students: response.data, search: search };
+      const page = await this.getStudentsPage({ name: search }, cursor);
+      console.log("getStudentsSync Students:", search, page.items);
+      return {students: page.items, search: search, next_cursor: page.next_cursor };
     } catch (error) {
       Logger.error("Error fetching students:", error);
     }
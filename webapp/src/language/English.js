@@ -202,7 +202,9 @@ const English = {
         name: "Name (Grade)",
         add_student: "Add Student",
         remove_student_tilte: "Remove Student",
-        remove_student_content: "Are you sure you want to remove student '{0}'?"
+        remove_student_content: "Are you sure you want to remove student '{0}'?",
+        more_students: "Showing the first {0} matching students. Type a name to narrow the list, or load more.",
+        load_more: "Load more"
     },
     schedules: {
         id: "ID",
@@ -287,6 +289,7 @@ const English = {
         detail_description: "Description:",
         occupied_status: "{0} (Closed)",
         enrollment_fail: "'{0}' class is not available. Please choose another.",
+        enrollment_waitlisted: "'{0}' class is full. You are number {1} on its waitlist and will be enrolled automatically when a seat opens.",
         add_student: "Add student",
         request: "If you have any additional requests, please write them below.",
         request_confirm: "Request memo:",
@@ -202,7 +202,9 @@ const Korean = {
         name: "이름(학년)",
         add_student: "추가",
         remove_student_tilte: "학생 제거",
-        remove_student_content: "학생 '{0}'을(를) 제거하시겠습니까?"
+        remove_student_content: "학생 '{0}'을(를) 제거하시겠습니까?",
+        more_students: "검색된 학생 중 처음 {0}명만 표시됩니다. 이름을 입력해 범위를 좁히거나 더 불러오세요.",
+        load_more: "더 불러오기"
     },
     schedules: {
         id: "아이디",
@@ -287,6 +289,7 @@ const Korean = {
         detail_description: "설명:",
         occupied_status:"{0} (신청마감)",
         enrollment_fail: "'{0}' 과목은 신청이 불가합니다. 다른 과목으로 변경후 재신청 바랍니다.",
+        enrollment_waitlisted: "'{0}' 과목은 정원이 찼습니다. 대기 {1}번으로 등록되었으며 자리가 나면 자동으로 신청됩니다.",
         add_student: "학생추가하기",
         request: "기타 요청사항이 있으면 적어주세요.",
         request_confirm: "요청사항 메모:",